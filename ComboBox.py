@@ -1,18 +1,35 @@
 import ui
-from objc_util import UIEdgeInsets, ObjCClass
+import asyncio
+import background
+import colors
+import drawing
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from collections.abc import Mapping
+from objc_util import UIEdgeInsets, ObjCClass, on_main_thread
+from measure import SizeCache
 
 
 NSIndexPath = ObjCClass('NSIndexPath')
 
+STYLE_KEYS = ('font', 'text_color', 'highlight_color', 'button_tint', 'bg_color')
+
+# text of the rows shown while choices load
+PLACEHOLDER = '\u2026'
+
 """ComboBox is a ui.View subclass that allows a
 string to be chosen from a list of choices.
 Needs the superview object for the dropbox.
 Accepts all kwargs of ui.View, as well as:
 	font						 ->		Font of all choice strings
-	choices					 ->		List of choice strings
+	choices					 ->		List of choice strings, or a sequence-like
+												provider such as PagedChoices that is read lazily,
+												or a loader for load_choices
 	selected_index	 ->		Initial choice index
 	button_tint 		 ->		Color of the dropdown button tint
-	display_count		 ->		Number of rows to display in the drop down"""
+	display_count		 ->		Number of rows to display in the drop down
+	searchable			 ->		Filter the drop down by typing while it is open"""
 class ComboBox (ui.View):
 	"""ComboBox initialization"""
 	def __init__(self, _superview, *args, **kwargs):
@@ -23,6 +40,12 @@ class ComboBox (ui.View):
 		kwargs.setdefault('corner_radius', 3.5)
 		kwargs.setdefault('name', 'ComboBox')
 		
+		self._splitter = drawing.LinePath()
+		self._load_gen = 0
+		self._load_task = None
+		# selected_index asked for before a load delivered that row
+		self._wanted_index = None
+
 		# custom kwargs
 		self.font 					 = kwargs.pop('font', ('<System>', 20))
 		self.text_color 		 = kwargs.pop('text_color', "black")
@@ -30,15 +53,23 @@ class ComboBox (ui.View):
 		self.button_tint 		 = kwargs.pop('button_tint', "grey")
 		self.display_count	 = kwargs.pop('display_count', 5)
 		self.selected_index  = kwargs.pop('selected_index', 0)	
-		self.choices			   = kwargs.pop('choices', [""])		
+		choices = kwargs.pop('choices', [""])
+		loader = choices if _is_loader(choices) else None
+		if loader is not None:
+			choices = [PLACEHOLDER] * max(self.display_count, 1)
+			wanted, self.selected_index = self.selected_index, 0
+		elif not _is_choices(choices):
+			raise ValueError('Choices must be a list of strings or a sequence of strings')
+		self.choices			   = choices
+		self.searchable		   = kwargs.pop('searchable', False)
+		self._query = ''
 		
 		# init super 
 		ui.View.__init__(self, *args, **kwargs)
 		
 		x, y, w, h = self.frame
-		row_sizes = [ui.measure_string(i, font=self.font) for i in self.choices]
-		w = max([w] + [i[0] for i in row_sizes])
-		h = max([h] + [i[1] for i in row_sizes])
+		w = max(w, self._sizes.max_width)
+		h = max(h, self._sizes.max_height)
 		# button for the dropbox
 		self.drop_button = ui.Button(name='drop_button',
 																 frame=(w - h - 3, 3, h, h - 6),
@@ -51,6 +82,15 @@ class ComboBox (ui.View):
 																	 text=self.choices[self.selected_index],
 																	 frame=(3, 3, w - self.drop_button.width - 6, h),
 																	 corner_radius=self.corner_radius)
+		# search field over the selected label
+		self.search_field = ui.TextField(name='search_field',
+																		 alignment=ui.ALIGN_CENTER,
+																		 font=self.font,
+																		 placeholder='Search',
+																		 bordered=False,
+																		 delegate=self,
+																		 frame=self.selected_label.frame,
+																		 hidden=True)
 		# dropbox
 		lbl_w = self.selected_label.width
 		ds = ComboBoxDataSource(self.choices,
@@ -59,7 +99,8 @@ class ComboBox (ui.View):
 														self.bg_color,
 														self.index_changed,
 														self.selected_index,
-														self.highlight_color)
+														self.highlight_color,
+														self.display_count)
 		self.dropbox = ui.TableView(name='dropbox',
 																bg_color=self.bg_color,
 																data_source=ds,
@@ -82,8 +123,12 @@ class ComboBox (ui.View):
 
 		# add subviews
 		self.add_subview(self.selected_label)
+		self.add_subview(self.search_field)
 		self.add_subview(self.drop_button)
 		_superview.add_subview(self.dropbox)
+		if loader is not None:
+			self._wanted_index = wanted
+			self.load_choices(loader)
 	
 	@property
 	def font(self):
@@ -93,10 +138,13 @@ class ComboBox (ui.View):
 	def font(self, value):
 		if type(value) == tuple:
 			self._font = value
+			if hasattr(self, '_sizes'):
+				self._sizes.reset(value, self._measured_choices())
 			if hasattr(self, 'selected_label'):
 				self.selected_label.font = value
+				self.search_field.font = value
 			if hasattr(self, 'dropbox'):
-				self._data_source.font = value
+				self.dropbox.data_source.style.update(font=value)
 				self.layout()
 	
 	@property
@@ -105,15 +153,13 @@ class ComboBox (ui.View):
 	
 	@text_color.setter
 	def text_color(self, value):
-		value = ui.parse_color(value)
+		value = colors.parse(value)
 		self._text_color = value
 		if hasattr(self, 'selected_label'):
 			self.selected_label.text_color = value
 		if hasattr(self, 'dropbox'):
-			self.dropbox.data_source.text_color = value
+			self.dropbox.data_source.style.update(text_color=value)
 			self.dropbox.data_source.reload_cells()
-			self.dropbox.reload()
-			self.dropbox.selected_row = self.selected_index
 	
 	@property
 	def highlight_color(self):
@@ -121,13 +167,11 @@ class ComboBox (ui.View):
 	
 	@highlight_color.setter
 	def highlight_color(self, value):
-		value = ui.parse_color(value)
+		value = colors.parse(value)
 		self._highlight_color = value
 		if hasattr(self, 'dropbox'):
-			self.dropbox.data_source.highlight_color = value
+			self.dropbox.data_source.style.update(highlight_color=value)
 			self.dropbox.data_source.reload_cells()
-			self.dropbox.reload()
-			self.dropbox.selected_row = self.selected_index
 	
 	@property
 	def selected_index(self):
@@ -150,8 +194,14 @@ class ComboBox (ui.View):
 	
 	@choices.setter
 	def choices(self, value):
-		if type(value) is list and all(type(i) == str for i in value):
+		if _is_choices(value):
+			if getattr(self, '_searchable', False):
+				_check_searchable(value)
+			self._cancel_load()
+			self._wanted_index = None
 			self._choices = value
+			self._sizes = SizeCache(self.font, self._measured_choices())
+			self._index = None
 			if hasattr(self, 'dropbox'):
 				ds = ComboBoxDataSource(value,
 																self.font,
@@ -159,19 +209,39 @@ class ComboBox (ui.View):
 																self.bg_color,
 																self.index_changed,
 																self.selected_index,
-																self.highlight_color)
+																self.highlight_color,
+																self.display_count)
 				self.dropbox.data_source = ds
 				self.dropbox.delegate = ds
-				self.dropbox.reload()
+				self._query = ''
+				self.search_field.text = ''
 				self.layout()
 	
+	@property
+	def searchable(self):
+		return self._searchable
+
+	@searchable.setter
+	def searchable(self, value):
+		if value:
+			_check_searchable(self.choices)
+		self._searchable = bool(value)
+
+	def _measured_choices(self):
+		"""Choices that size the view. Lazy providers are only
+		measured over the rows the dropbox first shows."""
+		if type(self.choices) is list:
+			return self.choices
+		count = min(len(self.choices), self.display_count + CellPool.MARGIN)
+		return [self.choices[i] for i in range(count)]
+
 	@property
 	def button_tint(self):
 		return self._btn_tint
 	
 	@button_tint.setter
 	def button_tint(self, value):
-		value = ui.parse_color(value)
+		value = colors.parse(value)
 		if hasattr(self, 'drop_button'):
 			self.drop_button.tint_color = value
 		self._btn_tint = value
@@ -185,12 +255,53 @@ class ComboBox (ui.View):
 		if type(value) is int:
 			self._display_count = value
 			if hasattr(self, 'dropbox'):
+				self.dropbox.data_source.pool.capacity = value + CellPool.MARGIN
 				self.layout()
 
+	def restyle(self, **props):
+		"""Applies any of STYLE_KEYS together, with one cell style
+		change and at most one layout (only when the font changes)"""
+		for attr in props:
+			if attr not in STYLE_KEYS:
+				raise AttributeError(f"ComboBox can't restyle '{attr}'")
+		style = {}
+		for attr in ('text_color', 'highlight_color', 'bg_color'):
+			if attr in props:
+				style[attr] = colors.parse(props[attr])
+		if 'button_tint' in props:
+			self.button_tint = props['button_tint']
+		if 'text_color' in style:
+			self._text_color = style['text_color']
+			self.selected_label.text_color = style['text_color']
+		if 'highlight_color' in style:
+			self._highlight_color = style['highlight_color']
+		if 'bg_color' in style:
+			self.bg_color = style['bg_color']
+			self.dropbox.bg_color = style['bg_color']
+		font = props.get('font', self.font)
+		if type(font) == tuple and font != self.font:
+			self._font = style['font'] = font
+			self._sizes.reset(font, self._measured_choices())
+			self.selected_label.font = font
+			self.search_field.font = font
+		if style:
+			ds = self.dropbox.data_source
+			ds.style.update(**style)
+			if 'font' in style:
+				self.layout()
+			else:
+				ds.reload_cells()
+
 	def layout(self):
-		sizes = [ui.measure_string(i, font=self.font) for i in self.choices]
-		_row_w = max(self.width, max(i[0] for i in sizes))
-		_row_h = max(i[1] for i in sizes) + 3
+		self._layout_frames()
+		self.dropbox.reload()
+		self.dropbox.selected_row = self.selected_index
+
+	def _layout_frames(self):
+		"""Lays out frames without reloading the dropbox.
+		Returns True if the row height changed."""
+		_row_w = max(self.width, self._sizes.max_width)
+		_row_h = self._sizes.max_height + 3
 		
 		# self layout
 		if _row_w != self.width:
@@ -201,6 +312,7 @@ class ComboBox (ui.View):
 		# selected label layout
 		self.selected_label.width = self.width - self.height - 6
 		self.selected_label.height = self.height - 6
+		self.search_field.frame = self.selected_label.frame
 		
 		# drop button layout
 		self.drop_button.x = self.width - self.height
@@ -209,13 +321,258 @@ class ComboBox (ui.View):
 		
 		# dropbox layout
 		_h = _row_h * min(self.display_count, len(self.choices))
+		changed = self.dropbox.row_height != _row_h
 		self.dropbox.row_height = _row_h
 		self.dropbox.width = self.selected_label.width
 		self.dropbox.x = self.x + 3
 		self.dropbox.y = self.y + self.height
 		self.dropbox.height = _h
+
+		# repaint just the splitter strip if it moved
+		drawn = self._splitter.bounds()
+		line = self._splitter_line()
+		if drawn and self._splitter.key != line:
+			rect = drawing.union(drawn, drawing.line_bounds(*line))
+			drawing.set_needs_display_in_rect(self, rect)
+		return changed
+
+	def append_choice(self, text):
+		self.insert_choice(len(self.choices), text)
+
+	def insert_choice(self, index, text):
+		self.update_choices([('insert', index, text)])
+
+	def remove_choice(self, index):
+		self.update_choices([('remove', index)])
+
+	def replace_choice(self, index, text):
+		self.update_choices([('replace', index, text)])
+
+	def update_choices(self, diff):
+		"""Patches choices in place and reloads only the affected rows.
+		diff is a sequence of operations applied in order:
+			('insert', index, text)
+			('remove', index)
+			('replace', index, text)"""
+		if type(self.choices) is not list:
+			raise TypeError('Incremental updates need a list of choices')
+		ds = self.dropbox.data_source
+		pool = ds.pool
+		tv = self.dropbox.objc_instance
+		sel = self.selected_index
+		# row edits only map onto the table when it is unfiltered;
+		# filtered rows are patched here, without searching again
+		live = ds.rows is None
+		rows = None if live else list(ds.rows)
+		query = self._query.lower()
+		choice_index = self._index
+		# ops are sequential but UIKit reads one update block against
+		# the old rows (deletes, reloads) and the new rows (inserts), so
+		# a block only holds ops for which both readings agree
+		block = None
+		tv.beginUpdates()
+		try:
+			for op, index, *text in diff:
+				if live:
+					if block is not None and not _extends_block(block, op, index):
+						tv.endUpdates()
+						tv.beginUpdates()
+						block = None
+					if block is None:
+						block = (op, set(), [index])
+					block[1].add(index)
+					block[2][0] = index
+				count = len(self.choices)
+				if op == 'insert':
+					_check_choice(text)
+					if not 0 <= index <= count:
+						raise IndexError('choice index out of range')
+					self.choices.insert(index, text[0])
+					self._sizes.add(text)
+					if choice_index is not None:
+						choice_index.insert(index, text[0])
+					if rows is not None:
+						_shift_rows(rows, index, 1, query in text[0].lower())
+					if live:
+						pool.shift(index, 1)
+						self.dropbox.insert_rows([index])
+					if index <= sel:
+						sel += 1
+				elif op == 'remove':
+					if not 0 <= index < count:
+						raise IndexError('choice index out of range')
+					if count == 1:
+						raise ValueError('ComboBox needs at least one choice')
+					self._sizes.remove([self.choices.pop(index)])
+					if choice_index is not None:
+						choice_index.remove(index)
+					if rows is not None:
+						_shift_rows(rows, index, -1)
+					if live:
+						pool.discard(index)
+						pool.shift(index + 1, -1)
+						self.dropbox.delete_rows([index])
+					if index < sel or sel == count - 1:
+						sel -= 1
+				elif op == 'replace':
+					_check_choice(text)
+					if not 0 <= index < count:
+						raise IndexError('choice index out of range')
+					self._sizes.remove([self.choices[index]])
+					self.choices[index] = text[0]
+					self._sizes.add(text)
+					if choice_index is not None:
+						choice_index.replace(index, text[0])
+					if rows is not None:
+						_shift_rows(rows, index, 0, query in text[0].lower())
+					if live:
+						pool.discard(index)
+						path = NSIndexPath.indexPathForRow_inSection_(index, 0)
+						tv.reloadRowsAtIndexPaths_withRowAnimation_([path], 5)
+				else:
+					raise ValueError(f'Unknown choices operation: {op!r}')
+		finally:
+			tv.endUpdates()
+			self.selected_index = sel
+			ds.selected_row = sel
+			if not live:
+				self._show_rows(rows)
+			elif self._layout_frames():
+				self.dropbox.reload()
+			self.dropbox.selected_row = sel
+
+	def load_choices(self, source, placeholders=None, chunk_size=32, loop=None):
+		"""Loads choices off the caller's thread. source is one of:
+			an awaitable giving a list of strings
+			an async iterator of strings (or of lists of strings)
+			a callable run on a background thread, returning an iterable
+		placeholders rows (display_count by default) show at once and
+		are filled in chunks of chunk_size as strings arrive; only those
+		rows are reloaded. Any load still running is cancelled, as is this
+		one when choices are set again. Awaitables and async iterators
+		run on loop, the running loop, or a background loop (see
+		background.run). Returns the task or future, or the thread."""
+		if not _is_loader(source):
+			raise TypeError('load_choices expects an awaitable, an async iterator or a callable')
+		count = self.display_count if placeholders is None else placeholders
+		count = max(count, 1)
+		# the selection is held, showing a placeholder, until its row loads
+		wanted = self._wanted_index
+		if wanted is None:
+			wanted = self.selected_index
+		self.selected_index = 0
+		self.choices = [PLACEHOLDER] * count
+		self._wanted_index = wanted
+		gen = self._load_gen
+		self._loaded = 0
+		self._placeholders = count
+		deliver = lambda chunk, done=False: self._deliver(gen, chunk, done)
+
+		if callable(source):
+			def run():
+				chunk = []
+				for text in source():
+					if gen != self._load_gen:
+						return
+					chunk.append(text)
+					if len(chunk) >= chunk_size:
+						deliver(chunk)
+						chunk = []
+				deliver(chunk, True)
+			thread = self._load_task = threading.Thread(target=run, daemon=True)
+			thread.start()
+			return thread
+
+		async def pump():
+			if hasattr(source, '__aiter__'):
+				chunk = []
+				async for item in source:
+					if type(item) is list:
+						deliver(chunk + item)
+						chunk = []
+						continue
+					chunk.append(item)
+					if len(chunk) >= chunk_size:
+						deliver(chunk)
+						chunk = []
+				deliver(chunk, True)
+			else:
+				items = list(await source)
+				for i in range(0, len(items), chunk_size):
+					if not deliver(items[i:i + chunk_size]):
+						return
+					await asyncio.sleep(0)
+				deliver([], True)
+		task = self._load_task = background.run(pump(), loop)
+		return task
+
+	def _cancel_load(self):
+		self._load_gen += 1
+		task, self._load_task = self._load_task, None
+		if hasattr(task, 'cancel'):
+			task.cancel()
+
+	@on_main_thread
+	def _deliver(self, gen, chunk, done=False):
+		# returns False once the load is stale
+		if gen != self._load_gen:
+			return False
+		diff = []
+		for i, text in enumerate(chunk, self._loaded):
+			diff.append(('replace' if i < self._placeholders else 'insert', i, text))
+		self._loaded += len(chunk)
+		if done:
+			self._load_task = None
+			if not self._loaded:
+				# keep one empty row, ComboBox needs a choice
+				diff.append(('replace', 0, ''))
+				self._loaded = 1
+			for i in range(self._placeholders - 1, self._loaded - 1, -1):
+				diff.append(('remove', i))
+		if diff:
+			self.update_choices(diff)
+		# a held selection applies once its row has arrived
+		wanted = self._wanted_index
+		if wanted is not None and (wanted < self._loaded or done):
+			self._wanted_index = None
+			self._select(min(wanted, len(self.choices) - 1))
+		return True
+
+	def _select(self, index):
+		self.selected_index = index
+		ds = self.dropbox.data_source
+		ds.selected_row = index
+		row = ds.display_row(index)
+		if row != -1:
+			self.dropbox.selected_row = row
+
+	def filter(self, query):
+		"""Shows only the choices containing query, ignoring case"""
+		self._query = query
+		ds = self.dropbox.data_source
+		if not query:
+			rows = None
+		elif hasattr(self.choices, 'search'):
+			rows = self.choices.search(query)
+		else:
+			_check_searchable(self.choices)
+			if self._index is None:
+				self._index = ChoiceIndex(self.choices)
+			rows = self._index.search(query)
+		self._show_rows(rows)
+
+	def _show_rows(self, rows):
+		ds = self.dropbox.data_source
+		ds.rows = rows
+		ds.pool.recycle()
+		self._layout_frames()
 		self.dropbox.reload()
-		self.dropbox.selected_row = self.selected_index
+		row = ds.display_row(self.selected_index)
+		if row != -1:
+			self.dropbox.selected_row = row
+
+	def textfield_did_change(self, textfield):
+		self.filter(textfield.text)
 	
 	def touch_began(self, touch):
 		if self._hit_test(touch):
@@ -230,18 +587,28 @@ class ComboBox (ui.View):
 				return True
 		return False
 	
+	def _splitter_line(self):
+		x = self.selected_label.width + 4.5
+		return x, 0, x, self.height, self.border_width
+
 	def draw(self):
-		# draw the splitter line
-		p = ui.Path()
-		p.move_to(self.selected_label.width + 4.5, 0)
-		p.line_to(self.selected_label.width + 4.5, self.height)
-		p.line_width = self.border_width
+		# draw the splitter line, rebuilt only when it moves
 		ui.set_color(self.border_color)
-		p.stroke()
+		self._splitter.get(*self._splitter_line()).stroke()
 	
 	def do_dropbox(self, sender=None):
 		self.dropbox.hidden = not self.dropbox.hidden
 		self.drop_button.enabled = self.dropbox.hidden
+		if self.searchable:
+			self.search_field.hidden = self.dropbox.hidden
+			self.selected_label.hidden = not self.dropbox.hidden
+			if self.dropbox.hidden:
+				self.search_field.end_editing()
+				if self._query:
+					self.search_field.text = ''
+					self.filter('')
+			else:
+				self.search_field.begin_editing()
 
 	def index_changed(self, sender):
 		new_index = sender.selected_row
@@ -250,38 +617,312 @@ class ComboBox (ui.View):
 			self.do_dropbox()
 			
 
-class ComboBoxDataSource (object):
-	def __init__(self, data, font, text_color, bg_color, 
-							 action, selected_index, highlight_color):
-		if not type(data) is list and not all(type(i) == str for i in data):
-			raise ValueError('Data must be list of strings')
-		self.items = data
+def _is_choices(value):
+	if type(value) is list:
+		return all(type(i) == str for i in value)
+	return (not isinstance(value, (str, Mapping)) and
+					hasattr(value, '__len__') and hasattr(value, '__getitem__'))
+
+
+def _is_loader(value):
+	return (callable(value) or hasattr(value, '__aiter__') or
+					asyncio.isfuture(value) or asyncio.iscoroutine(value))
+
+
+def _extends_block(block, op, index):
+	"""Whether op at index can join the update block (op, rows, [last]):
+	same kind, with inserts ascending, removes descending and
+	replaces on distinct rows"""
+	kind, rows, (last,) = block
+	if op != kind:
+		return False
+	if op == 'insert':
+		return index > last
+	if op == 'remove':
+		return index < last
+	return index not in rows
+
+
+def _shift_rows(rows, index, delta, match=False):
+	"""Patches sorted filtered rows for an insert (delta 1), remove
+	(delta -1) or replace (delta 0) at index; match says whether
+	the new text passes the filter"""
+	at = bisect_left(rows, index)
+	present = at < len(rows) and rows[at] == index
+	if not delta:
+		if present and not match:
+			del rows[at]
+		elif match and not present:
+			rows.insert(at, index)
+		return
+	if delta < 0 and present:
+		del rows[at]
+	for i in range(at, len(rows)):
+		rows[i] += delta
+	if delta > 0 and match:
+		rows.insert(at, index)
+
+
+def _check_searchable(choices):
+	# indexing a lazy provider would fetch every row
+	if type(choices) is not list and not hasattr(choices, 'search'):
+		raise ValueError('searchable needs a list of choices or a provider with search()')
+
+
+def _check_choice(text):
+	if len(text) != 1 or type(text[0]) is not str:
+		raise TypeError('choices must be strings')
+
+
+class PagedChoices (object):
+	"""Read-only, sequence-like choices backed by a page callback.
+	fetch_page(offset, limit) returns a list of at most limit
+	strings starting at offset. Only max_pages pages are kept.
+	An optional search(query) callback returning sorted indices
+	is used by searchable ComboBoxes instead of an index."""
+	def __init__(self, count, fetch_page, page_size=64, max_pages=8, search=None):
+		self.count = count
+		self.fetch_page = fetch_page
+		self.page_size = page_size
+		self.max_pages = max_pages
+		self.pages = OrderedDict()
+		if search is not None:
+			self.search = search
+
+	def __len__(self):
+		return self.count
+
+	def __getitem__(self, index):
+		if not 0 <= index < self.count:
+			raise IndexError('choice index out of range')
+		page, offset = divmod(index, self.page_size)
+		return self.page(page)[offset]
+
+	def page(self, page):
+		rows = self.pages.pop(page, None)
+		if rows is None:
+			rows = self.fetch_page(page * self.page_size, self.page_size)
+			if len(self.pages) >= self.max_pages:
+				self.pages.popitem(last=False)
+		self.pages[page] = rows
+		return rows
+
+	def prefetch(self, index, window):
+		"""Loads the pages covering index +/- window"""
+		first = max(index - window, 0) // self.page_size
+		last = min(index + window, self.count - 1) // self.page_size
+		for page in range(first, last + 1):
+			if page not in self.pages:
+				self.page(page)
+
+
+class ChoiceIndex (object):
+	"""Case-insensitive n-gram index over a list of choices.
+	Queries up to GRAM characters are one dict lookup; longer
+	queries intersect the posting sets of their trigrams and
+	verify the remaining candidates. Postings hold stable row
+	ids, so rows can be inserted, removed and replaced without
+	touching the postings of the other rows."""
+	GRAM = 3
+
+	def __init__(self, choices):
+		self.ids = []
+		self.folded = {}
+		self.grams = {}
+		self._next_id = 0
+		# row id -> position, rebuilt on the first search after
+		# an insert or remove
+		self._positions = None
+		for text in choices:
+			self.ids.append(self._add(text))
+
+	def insert(self, index, text):
+		self.ids.insert(index, self._add(text))
+		self._positions = None
+
+	def remove(self, index):
+		self._discard(self.ids.pop(index))
+		self._positions = None
+
+	def replace(self, index, text):
+		old = self.ids[index]
+		self._discard(old)
+		self.ids[index] = new = self._add(text)
+		if self._positions is not None:
+			del self._positions[old]
+			self._positions[new] = index
+
+	def search(self, query):
+		"""Sorted indices of the choices containing query"""
+		query = query.lower()
+		if len(query) <= self.GRAM:
+			found = self.grams.get(query, ())
+		else:
+			postings = sorted((self.grams.get(query[i:i + self.GRAM], set())
+												 for i in range(len(query) - self.GRAM + 1)), key=len)
+			found = [i for i in postings[0].intersection(*postings[1:])
+							 if query in self.folded[i]]
+		if self._positions is None:
+			self._positions = {row: index for index, row in enumerate(self.ids)}
+		return sorted(self._positions[i] for i in found)
+
+	@classmethod
+	def _grams(cls, text):
+		return {text[i:i + n]
+						for n in range(1, cls.GRAM + 1)
+						for i in range(len(text) - n + 1)}
+
+	def _add(self, text):
+		row = self._next_id
+		self._next_id += 1
+		self.folded[row] = folded = text.lower()
+		for g in self._grams(folded):
+			self.grams.setdefault(g, set()).add(row)
+		return row
+
+	def _discard(self, row):
+		for g in self._grams(self.folded.pop(row)):
+			rows = self.grams[g]
+			rows.discard(row)
+			if not rows:
+				del self.grams[g]
+
+
+class CellPool (object):
+	"""Bounded pool of ui.TableViewCells, reused by row.
+	Holds at most capacity cells; on a miss the least
+	recently used cell is handed out again for the new row."""
+	MARGIN = 3
+
+	def __init__(self, capacity, factory=ui.TableViewCell):
+		self.capacity = capacity
+		self.factory = factory
+		self.cells = OrderedDict()
+		self.free = []
+		self.hits = 0
+		self.misses = 0
+
+	def get(self, row):
+		"""Returns (cell, configured) for row. configured is False
+		when the cell is new or was recycled from another row."""
+		cell = self.cells.pop(row, None)
+		if cell is not None:
+			self.hits += 1
+			self.cells[row] = cell
+			return cell, True
+		self.misses += 1
+		if self.free:
+			cell = self.free.pop()
+		elif len(self.cells) >= self.capacity:
+			_, cell = self.cells.popitem(last=False)
+		else:
+			cell = self.factory()
+		self.cells[row] = cell
+		return cell, False
+
+	def discard(self, row):
+		cell = self.cells.pop(row, None)
+		if cell is not None:
+			self.free.append(cell)
+
+	def shift(self, start, delta):
+		"""Re-keys pooled rows >= start by delta after an insert or remove"""
+		self.cells = OrderedDict((r + delta if r >= start else r, c)
+														 for r, c in self.cells.items())
+
+	def recycle(self):
+		"""Keeps every cell for reuse but forgets which row it showed"""
+		self.free.extend(self.cells.values())
+		self.cells.clear()
+
+	def clear(self):
+		self.cells.clear()
+		self.free.clear()
+
+	def stats(self):
+		return {'hits': self.hits,
+						'misses': self.misses,
+						'live': len(self.cells) + len(self.free)}
+
+
+class CellStyle (object):
+	"""Font and colors of the dropbox cells. version grows on
+	every change so a pooled cell can tell it is out of date."""
+	def __init__(self, font, text_color, bg_color, highlight_color):
 		self.font = font
 		self.text_color = text_color
 		self.bg_color = bg_color
+		self.highlight_color = highlight_color
+		self.version = 0
+
+	def update(self, **changes):
+		for attr, value in changes.items():
+			if not hasattr(self, attr) or attr == 'version':
+				raise AttributeError(f"CellStyle has no attribute '{attr}'")
+			setattr(self, attr, value)
+		self.version += 1
+
+
+def _style_property(attr):
+	def fset(self, value):
+		self.style.update(**{attr: value})
+	return property(lambda self: getattr(self.style, attr), fset)
+
+
+class ComboBoxDataSource (object):
+	font = _style_property('font')
+	text_color = _style_property('text_color')
+	bg_color = _style_property('bg_color')
+	highlight_color = _style_property('highlight_color')
+
+	def __init__(self, data, font, text_color, bg_color, 
+							 action, selected_index, highlight_color, display_count=5):
+		if not _is_choices(data):
+			raise ValueError('Data must be list of strings or a sequence of strings')
+		self.items = data
+		self.style = CellStyle(font, text_color, bg_color, highlight_color)
 		self.selected_row = selected_index
 		self.action = action
-		self.cells = []
-		self.highlight_color = highlight_color
+		self.pool = CellPool(display_count + CellPool.MARGIN)
+		# style version each pooled cell was last styled with
+		self.styled = {}
+		# selected background view of each pooled cell; a UIView has
+		# one superview, so cells can't share one
+		self.highlights = {}
+		# indices of items shown while filtered, None shows all
+		self.rows = None
 						
 	def tableview_number_of_sections(self, tableview):
 		return 1
 	
 	def tableview_number_of_rows(self, tableview, section):
+		if self.rows is not None:
+			return len(self.rows)
 		return len(self.items)
 	
 	def tableview_cell_for_row(self, tableview, section, row):
-		cell = ui.TableViewCell()
-		cell.selectable = True
-		cell.text_label.alignment = ui.ALIGN_CENTER
+		cell, configured = self.pool.get(row)
+		if not configured:
+			index = self.item_index(row)
+			if hasattr(self.items, 'prefetch'):
+				self.items.prefetch(index, self.pool.capacity)
+			cell.selectable = True
+			cell.text_label.alignment = ui.ALIGN_CENTER
+			cell.text_label.text = self.items[index]
+		if self.styled.get(cell) != self.style.version:
+			self.style_cell(cell)
+		return cell
+
+	def style_cell(self, cell):
+		self.styled[cell] = self.style.version
 		cell.text_label.font = self.font
 		cell.text_label.text_color = self.text_color
-		cell.text_label.text = self.items[row]
 		cell.background_color = self.bg_color
-		highlight_view = ui.View(frame=cell.bounds, bg_color=self.highlight_color)
-		cell.objc_instance.setSelectedBackgroundView_(highlight_view.objc_instance)
-		self.cells.append(cell)
-		return cell
+		view = self.highlights.get(cell)
+		if view is None:
+			view = self.highlights[cell] = ui.View(flex='WH')
+			cell.objc_instance.setSelectedBackgroundView_(view.objc_instance)
+		view.bg_color = self.highlight_color
 
 	def tableview_can_delete(self, tableview, section, row):
 		return False
@@ -290,15 +931,29 @@ class ComboBoxDataSource (object):
 		return False
 	
 	def tableview_did_select(self, tableview, section, row):
-		self.selected_row = row
+		self.selected_row = self.item_index(row)
 		self.action(self)
+
+	def item_index(self, row):
+		if self.rows is not None:
+			return self.rows[row]
+		return row
+
+	def display_row(self, index):
+		"""Row showing items[index], or -1 if it is filtered out"""
+		if self.rows is None:
+			return index
+		row = bisect_left(self.rows, index)
+		if row < len(self.rows) and self.rows[row] == index:
+			return row
+		return -1
 	
 	def reload_cells(self):
-		for cell in self.cells:
-			cell.text_label.font = self.font
-			cell.text_label.text_color = self.text_color
-			highlight_view = ui.View(frame=cell.bounds, bg_color=self.highlight_color)
-		cell.objc_instance.setSelectedBackgroundView_(highlight_view.objc_instance)
+		"""Restyles the cells showing rows now; the others are
+		restyled when they are reused"""
+		for cell in self.pool.cells.values():
+			if self.styled.get(cell) != self.style.version:
+				self.style_cell(cell)
 
 
 if __name__ == "__main__":
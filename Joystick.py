@@ -1,7 +1,304 @@
 import ui
+import time
+import colors
+import ctypes
+import weakref
+import threading
+import objc_util
 import numpy as np
 from PIL import Image
 from io import BytesIO
+from collections import OrderedDict
+
+
+STICK_IMAGE = "iow:pinpoint_256"
+
+
+_sources = {}
+_scratch = {}
+
+
+def source_pixels(name):
+	"""uint8 RGBA pixels of image name, loaded once"""
+	arr = _sources.get(name)
+	if arr is None:
+		arr = np.ascontiguousarray(Image.open(name).convert("RGBA"), dtype=np.uint8)
+		_sources[name] = arr
+	return arr
+
+
+def recolor(src, tint, out=None):
+	"""Recolors the white glyph in src to tint.
+	The source alpha is used as coverage and scaled by the
+	tint alpha, so antialiased edges keep their blend. Writes
+	into out (uint8, shaped like src) when given."""
+	if out is None:
+		out = np.empty_like(src)
+	r, g, b, a = (int(round(i * 255.)) for i in tint)
+	out[..., 0] = r
+	out[..., 1] = g
+	out[..., 2] = b
+	if a == 255:
+		out[..., 3] = src[..., 3]
+	else:
+		scratch = _scratch.get(src.shape[:2])
+		if scratch is None:
+			scratch = _scratch[src.shape[:2]] = np.empty(src.shape[:2], np.uint16)
+		np.multiply(src[..., 3], a, out=scratch, dtype=np.uint16)
+		scratch += 127
+		scratch //= 255
+		out[..., 3] = scratch
+	return out
+
+
+def recolor_many(src, tints):
+	"""Recolors src to every tint into one (n, h, w, 4) block"""
+	out = np.empty((len(tints),) + src.shape, np.uint8)
+	for i, tint in enumerate(tints):
+		recolor(src, tint, out[i])
+	return out
+
+
+def tint_image(name, tint):
+	"""Renders image name recolored to tint as a ui.Image"""
+	if tuple(tint) == (0, 0, 0, 1):
+		return ui.Image(name)
+	return array2ui(recolor(source_pixels(name), tint))
+
+
+def _load_cg():
+	c = getattr(objc_util, "c", None)
+	try:
+		p, size, u32, i32 = ctypes.c_void_p, ctypes.c_size_t, ctypes.c_uint32, ctypes.c_int32
+		c.CGColorSpaceCreateDeviceRGB.restype = p
+		c.CGColorSpaceCreateDeviceRGB.argtypes = []
+		c.CGDataProviderCreateWithData.restype = p
+		c.CGDataProviderCreateWithData.argtypes = [p, p, size, p]
+		c.CGImageCreate.restype = p
+		c.CGImageCreate.argtypes = [size, size, size, size, size, p, u32, p, p, ctypes.c_bool, i32]
+		for name in ("CGImageRelease", "CGDataProviderRelease", "CGColorSpaceRelease"):
+			getattr(c, name).argtypes = [p]
+			getattr(c, name).restype = None
+	except AttributeError:
+		return None
+	return c
+
+
+_cg = _load_cg()
+_ALPHA_LAST = 3  # kCGImageAlphaLast, non-premultiplied RGBA
+UIImage = objc_util.ObjCClass("UIImage")
+
+
+class RawImage(object):
+	"""UIImage drawn straight from a uint8 RGBA array.
+	The CGImage reads the array's buffer, so the array is
+	kept alive for as long as the image is."""
+	def __init__(self, arr):
+		h, w, _ = arr.shape
+		cs = _cg.CGColorSpaceCreateDeviceRGB()
+		provider = _cg.CGDataProviderCreateWithData(None, arr.ctypes.data, arr.nbytes, None)
+		cg = _cg.CGImageCreate(w, h, 8, 32, w * 4, cs, _ALPHA_LAST, provider, None, False, 0)
+		try:
+			if not cg:
+				raise ValueError("CGImageCreate failed")
+			self.uiimage = UIImage.imageWithCGImage_(ctypes.c_void_p(cg))
+		finally:
+			_cg.CGImageRelease(cg)
+			_cg.CGDataProviderRelease(provider)
+			_cg.CGColorSpaceRelease(cs)
+		self.arr = arr
+		self.size = (w, h)
+
+	def draw(self, x, y, w, h):
+		rect = objc_util.CGRect(objc_util.CGPoint(x, y), objc_util.CGSize(w, h))
+		self.uiimage.drawInRect_(rect)
+
+
+def array2ui(arr):
+	"""Image for a (h, w, 4) uint8 array without a PNG round-trip.
+	Falls back to pil2ui when CoreGraphics is unavailable or the
+	array is not a contiguous RGBA buffer."""
+	if (_cg is not None and arr.dtype == np.uint8 and arr.ndim == 3 and
+			arr.shape[2] == 4 and arr.flags.c_contiguous):
+		try:
+			return RawImage(arr)
+		except (ValueError, ctypes.ArgumentError):
+			pass
+	return Joystick.joystickImage.pil2ui(Image.fromarray(arr))
+
+
+class TextureCache(object):
+	"""LRU cache of tinted ui.Images keyed by (image name, tint RGBA)"""
+	def __init__(self, maxsize=16):
+		self.maxsize = maxsize
+		self.images = OrderedDict()
+		self.hits = 0
+		self.misses = 0
+
+	def get(self, name, tint):
+		key = (name, tuple(tint))
+		img = self.images.pop(key, None)
+		if img is None:
+			self.misses += 1
+			img = tint_image(name, tint)
+			if len(self.images) >= self.maxsize:
+				self.images.popitem(last=False)
+		else:
+			self.hits += 1
+		self.images[key] = img
+		return img
+
+	def prewarm(self, tints, name=STICK_IMAGE):
+		"""Renders the textures for every uncached tint in one pass"""
+		tints = list(dict.fromkeys(colors.parse(i) for i in tints))
+		todo = [i for i in tints if (name, i) not in self.images and i != (0, 0, 0, 1)]
+		if todo:
+			block = recolor_many(source_pixels(name), todo)
+			for tint, arr in zip(todo, block):
+				self.misses += 1
+				if len(self.images) >= self.maxsize:
+					self.images.popitem(last=False)
+				self.images[(name, tint)] = array2ui(arr)
+
+	def clear(self):
+		self.images.clear()
+
+	def stats(self):
+		return {"hits": self.hits,
+						"misses": self.misses,
+						"size": len(self.images)}
+
+
+textures = TextureCache()
+
+
+class Dispatcher(object):
+	"""Coalesces joystick vectors and hands only the latest one
+	to action, at most rate times per second. Vectors shorter
+	than dead_zone are sent as (0, 0); vectors closer than
+	delta_threshold to the last one sent are dropped.
+	target picks where action runs:
+		None      ->  the UI thread, through ui.delay
+		"thread"  ->  a worker thread owned by the dispatcher
+		a loop    ->  an asyncio event loop"""
+	def __init__(self, action, rate=60, dead_zone=0, delta_threshold=0, target=None):
+		self.action = action
+		self.interval = 1. / rate
+		self.dead_zone = dead_zone
+		self.delta_threshold = delta_threshold
+		self.target = target
+		self.submitted = 0
+		self.coalesced = 0
+		self.skipped = 0
+		self.delivered = 0
+		self._pending = None
+		self._scheduled = False
+		self._closed = False
+		self._next = 0.
+		self._last = None
+		self._cond = threading.Condition()
+		if target == "thread":
+			self._worker = threading.Thread(target=self._run, daemon=True)
+			self._worker.start()
+
+	def submit(self, vec):
+		"""Queues vec, replacing any vector not yet delivered"""
+		with self._cond:
+			self.submitted += 1
+			if self._pending is not None:
+				self.coalesced += 1
+			self._pending = vec
+			if self._scheduled or self._closed:
+				return
+			self._scheduled = True
+			wait = max(0., self._next - time.perf_counter())
+			if self.target == "thread":
+				self._cond.notify()
+				return
+		if self.target is None:
+			ui.delay(self._deliver, wait)
+		else:
+			self.target.call_soon_threadsafe(self.target.call_later, wait, self._deliver)
+
+	def close(self):
+		with self._cond:
+			self._closed = True
+			self._pending = None
+			self._cond.notify()
+
+	def _run(self):
+		while True:
+			with self._cond:
+				while not self._scheduled and not self._closed:
+					self._cond.wait()
+				if self._closed:
+					return
+				wait = self._next - time.perf_counter()
+			if wait > 0:
+				time.sleep(wait)
+			self._deliver()
+
+	def _deliver(self):
+		with self._cond:
+			vec, self._pending = self._pending, None
+			self._scheduled = False
+			self._next = time.perf_counter() + self.interval
+		if vec is None:
+			return
+		x, y = vec
+		if x * x + y * y < self.dead_zone ** 2:
+			x = y = 0.
+			vec = ui.Point(0, 0)
+		if self._last is not None:
+			dx, dy = x - self._last[0], y - self._last[1]
+			if dx * dx + dy * dy < self.delta_threshold ** 2:
+				self.skipped += 1
+				return
+		self._last = (x, y)
+		self.delivered += 1
+		self.action(vec)
+
+	def stats(self):
+		return {"submitted": self.submitted,
+						"coalesced": self.coalesced,
+						"skipped": self.skipped,
+						"delivered": self.delivered}
+
+
+class StickVector(object):
+	"""Mutable stick vector handed to Joystick.action when the
+	joystick is created with reuse_vector=True. The same object
+	is updated on every touch, so copy it to keep a value."""
+	__slots__ = ("x", "y")
+
+	def __init__(self, x=0., y=0.):
+		self.x = x
+		self.y = y
+
+	def __iter__(self):
+		yield self.x
+		yield self.y
+
+	def __len__(self):
+		return 2
+
+	def __getitem__(self, i):
+		return (self.x, self.y)[i]
+
+	def __abs__(self):
+		return (self.x * self.x + self.y * self.y) ** .5
+
+	def __truediv__(self, k):
+		return ui.Point(self.x / k, self.y / k)
+
+	def __mul__(self, k):
+		return ui.Point(self.x * k, self.y * k)
+
+	def copy(self):
+		return ui.Point(self.x, self.y)
+
+	def __repr__(self):
+		return f"StickVector({self.x}, {self.y})"
 
 
 class Joystick(ui.View):
@@ -11,16 +308,7 @@ class Joystick(ui.View):
 			super().__init__(**kwargs)
 
 		def draw(self):
-			if self.tint_color != (0, 0, 0, 1):
-				pil = Image.open("iow:pinpoint_256")
-				arr = np.asarray(pil)
-				arr = np.where(arr == [255, 255, 255, 255],
-											 [int(i * 255.) for i in self.tint_color],
-											 [255, 255, 255, 0])
-				img = Image.fromarray(arr.astype("uint8"))
-				img = self.pil2ui(img)
-			else:
-				img = ui.Image("iow:pinpoint_256")
+			img = textures.get(STICK_IMAGE, self.tint_color)
 			img.draw(-.08 * self.superview.width,
 							 -.08 * self.superview.width,
 							 1.16 * self.superview.width,
@@ -36,20 +324,33 @@ class Joystick(ui.View):
 
 	def __init__(self, **kwargs):
 		self.action = None
+		self.dispatcher = None
+		self.recorder = None
+		self.latency = None
+		self._touch_time = 0.
+		self.vector = StickVector() if kwargs.pop("reuse_vector", False) else None
 		self.stick = Joystick.joystickImage(name="stick",
 																				frame=(0, 0, self.width, self.height))
 		if "texture_color" in kwargs.keys():
-			self.stick.tint_color = kwargs.pop("texture_color")
+			self.stick.tint_color = colors.parse(kwargs.pop("texture_color"))
+
+		dispatch = {k: kwargs.pop(k) for k in ("dispatch_rate", "dead_zone",
+																					 "delta_threshold", "dispatch_target")
+								if k in kwargs}
 
 		kwargs.setdefault("background_color", "white")
 		kwargs.setdefault("tint_color", "grey")
 		kwargs.setdefault("frame", (50, 50, 100, 100))
 		super().__init__(**kwargs)
+		if dispatch:
+			self.set_dispatch(dispatch.pop("dispatch_rate", 60),
+												target=dispatch.pop("dispatch_target", None),
+												**dispatch)
 
 		if self.width != self.height:
 			raise ValueError("Joystick frame must be square...")
 
-		self.radius = self.width / 2
+		self._set_radius(self.width / 2)
 		self.corner_radius = self.radius
 		self.stick.corner_radius = self.corner_radius
 		self.stick.touch_enabled = False
@@ -59,18 +360,73 @@ class Joystick(ui.View):
 		self.add_subview(self.stick)
 
 	def touch_moved(self, touch):
-		touch = touch.location
-		touchVec = touch - [self.radius] * 2
-		vecMagn = abs(touchVec)
-		if vecMagn < self.radius and self.bounds.contains_point(touch):
-			self.stick.center = touch
+		self.move_to(touch.location)
+
+	def move_to(self, touch):
+		"""Moves the stick toward touch, in view coordinates"""
+		if self.latency:
+			self._touch_time = time.perf_counter()
+		x, y = touch
+		c = self._center
+		vx = x - c
+		vy = y - c
+		d2 = vx * vx + vy * vy
+		if d2 < self._radius2 or not d2:
+			self.stick.center = (x, y)
+		else:
+			k = self.radius / d2 ** .5
+			self.stick.center = (c + vx * k, c + vy * k)
+		touchVec = self.vector
+		if touchVec is None:
+			touchVec = ui.Point(vx, vy)
 		else:
-			self.stick.center = touchVec / vecMagn * self.radius + [self.radius] * 2
+			touchVec.x = vx
+			touchVec.y = vy
+		if self.recorder:
+			self.recorder.moved(vx, vy)
 		if self.action:
-			self.action(touchVec)
+			if self.dispatcher:
+				self.dispatcher.submit(touchVec)
+			else:
+				self._dispatch(touchVec)
 
 	def touch_ended(self, touch):
+		self.release()
+
+	def release(self):
 		self.stick.center = self.originalPosition
+		if self.recorder:
+			self.recorder.ended()
+
+	def set_dispatch(self, rate, dead_zone=0, delta_threshold=0, target=None):
+		"""Delivers action through a Dispatcher at rate Hz.
+		A rate of None restores synchronous delivery."""
+		if self.dispatcher:
+			self._close_dispatcher.detach()
+			self.dispatcher.close()
+			self.dispatcher = None
+		if rate:
+			# the dispatcher only holds the joystick weakly, so a discarded
+			# joystick is collected and its finalizer stops a worker thread
+			ref = weakref.WeakMethod(self._dispatch)
+
+			def action(vec):
+				dispatch = ref()
+				if dispatch is not None:
+					dispatch(vec)
+			self.dispatcher = Dispatcher(action, rate, dead_zone,
+																	 delta_threshold, target)
+			self._close_dispatcher = weakref.finalize(self, self.dispatcher.close)
+
+	def _dispatch(self, touchVec):
+		if self.action:
+			if self.latency:
+				start = time.perf_counter()
+				self.action(touchVec)
+				self.latency.dispatch.add(start - self._touch_time)
+				self.latency.handler.add(time.perf_counter() - start)
+			else:
+				self.action(touchVec)
 
 	@property
 	def tint_color(self):
@@ -82,16 +438,138 @@ class Joystick(ui.View):
 		self.stick.bg_color = value
 		return
 
+	@property
+	def texture_color(self):
+		return self.stick.tint_color
+
+	@texture_color.setter
+	def texture_color(self, value):
+		self.stick.tint_color = colors.parse(value)
+		self.stick.set_needs_display()
+
+	def restyle(self, tint_color=None, texture_color=None):
+		"""Theme hook; the texture is drawn from the shared cache,
+		so prewarm it for a new tint first"""
+		if tint_color is not None:
+			self.tint_color = tint_color
+		if texture_color is not None:
+			self.texture_color = texture_color
+
+	def _set_radius(self, radius):
+		# geometry used by move_to, cached here so touches only do float math
+		self.radius = radius
+		self._center = radius
+		self._radius2 = radius * radius
+
 	def layout(self):
 		if self.width != self.height:
 			raise ValueError("Joystick frame must be square...")
-		self.radius = self.width / 2
+		self._set_radius(self.width / 2)
 		self.corner_radius = self.radius
 		self.stick.corner_radius = self.corner_radius
 		self.originalPosition = self.stick.center
 		self.stick.frame = (0, 0, self.width, self.height)
 
 
+def clamp_vectors(vectors, radii):
+	"""Vectors (n, 2) scaled back onto their radius wherever
+	they reach past it, as Joystick.touch_moved does per stick"""
+	magn = np.hypot(vectors[:, 0], vectors[:, 1])
+	scale = np.minimum(1., radii / np.maximum(magn, 1e-12))
+	return vectors * scale[:, None]
+
+
+class JoystickPad(ui.View):
+	"""Several stick regions in one view, with one touch dispatcher
+	and one shared texture. Stick state is packed in a float array
+	with a row per stick: center x, center y, radius, vector x, vector y.
+	action is called as action(index, vector).
+	Accepts all kwargs of ui.View, as well as:
+		sticks					->	List of (center_x, center_y, radius)
+		texture_color		->	Tint of the stick texture
+		stick_color			->	Fill of the moving stick
+		base_color			->	Fill of each stick's resting area"""
+	CX, CY, R, VX, VY = range(5)
+
+	def __init__(self, **kwargs):
+		self.action = None
+		self.state = np.zeros((0, 5))
+		self._touches = {}
+		self.texture_color = colors.parse(kwargs.pop("texture_color", "black"))
+		self.stick_color = colors.parse(kwargs.pop("stick_color", "grey"))
+		self.base_color = colors.parse(kwargs.pop("base_color", "white"))
+		sticks = kwargs.pop("sticks", ())
+		kwargs.setdefault("multitouch_enabled", True)
+		super().__init__(**kwargs)
+		for stick in sticks:
+			self.add_stick(*stick)
+
+	def restyle(self, **props):
+		"""Theme hook; sets any of texture_color, stick_color and
+		base_color with a single redraw"""
+		for attr, value in props.items():
+			if attr not in ("texture_color", "stick_color", "base_color"):
+				raise AttributeError(f"JoystickPad can't restyle '{attr}'")
+			setattr(self, attr, colors.parse(value))
+		if props:
+			self.set_needs_display()
+
+	def add_stick(self, center_x, center_y, radius):
+		"""Adds a stick region and returns its index"""
+		self.state = np.vstack([self.state, [center_x, center_y, radius, 0., 0.]])
+		self.set_needs_display()
+		return len(self.state) - 1
+
+	def stick_at(self, point):
+		"""Index of the stick whose region holds point, or -1"""
+		x, y = point
+		s = self.state
+		d2 = (s[:, self.CX] - x) ** 2 + (s[:, self.CY] - y) ** 2
+		inside = np.flatnonzero(d2 <= s[:, self.R] ** 2)
+		return int(inside[0]) if len(inside) else -1
+
+	def touch_began(self, touch):
+		index = self.stick_at(touch.location)
+		if index != -1:
+			self._touches[touch.touch_id] = index
+			self._move(index, touch.location)
+
+	def touch_moved(self, touch):
+		index = self._touches.get(touch.touch_id)
+		if index is not None:
+			self._move(index, touch.location)
+
+	def touch_ended(self, touch):
+		index = self._touches.pop(touch.touch_id, None)
+		if index is not None:
+			self.state[index, self.VX:] = 0.
+			self.set_needs_display()
+
+	def _move(self, index, location):
+		row = self.state[index]
+		x, y = location
+		vx = x - float(row[self.CX])
+		vy = y - float(row[self.CY])
+		row[self.VX] = vx
+		row[self.VY] = vy
+		self.set_needs_display()
+		if self.action:
+			self.action(index, ui.Point(vx, vy))
+
+	def draw(self):
+		s = self.state
+		if not len(s):
+			return
+		knobs = s[:, :2] + clamp_vectors(s[:, self.VX:], s[:, self.R])
+		img = textures.get(STICK_IMAGE, self.texture_color)
+		for (cx, cy, r, _, _), (kx, ky) in zip(s, knobs):
+			ui.set_color(self.base_color)
+			ui.Path.oval(cx - r, cy - r, 2 * r, 2 * r).fill()
+			ui.set_color(self.stick_color)
+			ui.Path.oval(kx - r, ky - r, 2 * r, 2 * r).fill()
+			img.draw(kx - 1.16 * r, ky - 1.16 * r, 2.32 * r, 2.32 * r)
+
+
 if __name__ == "__main__":
 	x, y = ui.get_screen_size()
 
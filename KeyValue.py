@@ -1,5 +1,17 @@
 import ui
+import background
+import colors
+import drawing
+import measure
+import threading
 import validator
+from contextlib import contextmanager
+from objc_util import on_main_thread
+
+
+def _str_error(attr):
+	raise TypeError(f"'{attr}' expects a string")
+
 
 def _color_error(attr):
 	raise Exception(f"'{attr}' expects expects a valid color string, RGB tuple, or RGBA tuple")
@@ -13,9 +25,59 @@ def _int_or_float_error(attr, tup=False):
 	raise Exception(f"'{attr}' expects a positive int or float" + ('2 tuple' if tup else ''))
 
 
+def _int_or_float_pair_error(attr):
+	_int_or_float_error(attr, True)
+
+
+def _is_size(value):
+	return isinstance(value, (int, float)) and value >= 0
+
+
+def _is_size_pair(value):
+	return type(value) is tuple and len(value) == 2 and all(_is_size(i) for i in value)
+
+
+# property -> (check, error raiser)
+_CHECKS = {
+	'key_text': (lambda v: type(v) is str, _str_error),
+	'value_text': (lambda v: type(v) is str, _str_error),
+	'key_font': (validator.validate_font, _font_error),
+	'value_font': (validator.validate_font, _font_error),
+	'key_color': (validator.validate_color, _color_error),
+	'value_color': (validator.validate_color, _color_error),
+	'underline_color': (validator.validate_color, _color_error),
+	'key_padding': (_is_size, _int_or_float_error),
+	'value_padding': (_is_size, _int_or_float_error),
+	'underline_width': (_is_size, _int_or_float_error),
+	'underline_padding': (_is_size_pair, _int_or_float_pair_error),
+}
+
+_COLORS = ('key_color', 'value_color', 'underline_color')
+
+
+def _validate(attr, value):
+	check, error = _CHECKS[attr]
+	if not check(value):
+		error(attr)
+
+
 class KeyValue (ui.View):
 	def __init__(self, *args, **kwargs):
 		kwargs.setdefault("bg_color", "white")
+		self._batch = 0
+		self._needs_layout = False
+		self._needs_display = False
+		self._underline = drawing.LinePath()
+		self._key_padding = 5
+		self._value_padding = 5
+		self._feed_lock = threading.Lock()
+		self._fed = {}
+		self._idle_frames = 0
+		self._frames_running = False
+		self._measured = {}
+		self.layout_stats = {'hits': 0, 'misses': 0}
+		self.feed_stats = {'fed': 0, 'applied': 0, 'coalesced': 0, 'dropped': 0}
+		self.frame_rate = 60
 		self.underline_color = "black"
 		self.underline_width = 1
 		self.underline_padding = (5, 5)
@@ -23,14 +85,12 @@ class KeyValue (ui.View):
 		self.key_label = ui.Label(name="key",
 												 			text="Key",
 												 			flex='')
-		self.key_label.size_to_fit()
 		self.key_label.x = 5
 		
 		self.value_label = ui.Label(name="value",
 													 			text="Value",
 													 			alignment=ui.ALIGN_RIGHT,
 													 			flex='')
-		self.value_label.size_to_fit()
 		self.value_label.x = self.width - self.value_label.width - 5
 		
 		ui.View.__init__(self, *args, **kwargs)
@@ -49,10 +109,9 @@ class KeyValue (ui.View):
 	
 	@key_text.setter
 	def key_text(self, value):
-		if type(value) is str:
-			self.key_label.text = value
-		else:
-			raise TypeError("'key_text' expects a string")
+		_validate('key_text', value)
+		self.key_label.text = value
+		self._invalidate(layout=True)
 			
 	@property
 	def key_font(self):
@@ -60,10 +119,9 @@ class KeyValue (ui.View):
 	
 	@key_font.setter
 	def key_font(self, value):
-		if validator.validate_font(value):
-			self.key_label.font = value
-		else:
-			_font_error("key_font")
+		_validate('key_font', value)
+		self.key_label.font = value
+		self._invalidate(layout=True)
 			
 	@property
 	def key_color(self):
@@ -71,21 +129,21 @@ class KeyValue (ui.View):
 	
 	@key_color.setter
 	def key_color(self, value):
-		if validator.validate_color(value):
-			self.key_label.text_color = value
-		else:
-			_color_error("key_color")
+		_validate('key_color', value)
+		self.key_label.text_color = colors.parse(value)
 	
 	@property
 	def key_padding(self):
-		return self.key_label.x
+		return self._key_padding
 	
 	@key_padding.setter
 	def key_padding(self, value):
-		if isinstance(value, (int, float)) and value >= 0:
-			self.key_label.x = value
+		_validate('key_padding', value)
+		self._key_padding = value
+		if self._batch:
+			self._needs_layout = True
 		else:
-			_int_or_float_error('key_padding')
+			self.key_label.x = value
 	
 	@property
 	def value_text(self):
@@ -93,10 +151,9 @@ class KeyValue (ui.View):
 
 	@value_text.setter
 	def value_text(self, value):
-		if type(value) is str:
-			self.value_label.text = value
-		else:
-			raise TypeError("'value_text' expects a string")
+		_validate('value_text', value)
+		self.value_label.text = value
+		self._invalidate(layout=True)
 	
 	@property
 	def value_font(self):
@@ -104,10 +161,9 @@ class KeyValue (ui.View):
 	
 	@value_font.setter
 	def value_font(self, value):
-		if validator.validate_font(value):
-			self.value_label.font = value
-		else:
-			_font_error("key_font")
+		_validate('value_font', value)
+		self.value_label.font = value
+		self._invalidate(layout=True)
 	
 	@property
 	def value_color(self):
@@ -115,21 +171,21 @@ class KeyValue (ui.View):
 			
 	@value_color.setter
 	def value_color(self, value):
-		if validator.validate_color(value):
-			self.value_label.text_color = value
-		else:
-			_color_error("value_color")
+		_validate('value_color', value)
+		self.value_label.text_color = colors.parse(value)
 	
 	@property
 	def value_padding(self):
-		return self.width - (self.value_label.x + self.value_label.width)
+		return self._value_padding
 	
 	@value_padding.setter
 	def value_padding(self, value):
-		if isinstance(value, (int, float)) and value >= 0:
-			self.value_label.x = self.width - self.value_label.width - value
+		_validate('value_padding', value)
+		self._value_padding = value
+		if self._batch:
+			self._needs_layout = True
 		else:
-			_int_or_float_error("value_padding")
+			self.value_label.x = self.width - self.value_label.width - value
 	
 	@property
 	def underline_color(self):
@@ -137,11 +193,9 @@ class KeyValue (ui.View):
 	
 	@underline_color.setter
 	def underline_color(self, value):
-		if validator.validate_color(value):
-			self._underline_color = value
-			self.set_needs_display()
-		else:
-			_color_error("underline_color")
+		_validate('underline_color', value)
+		self._underline_color = colors.parse(value)
+		self._invalidate(display=True)
 		
 	@property
 	def underline_width(self):
@@ -149,11 +203,9 @@ class KeyValue (ui.View):
 	
 	@underline_width.setter
 	def underline_width(self, value):
-		if isinstance(value, (int, float)) and value >= 0:
-			self._underline_width = value
-			self.set_needs_display()
-		else:
-			_int_or_float_error("underline_width")
+		_validate('underline_width', value)
+		self._underline_width = value
+		self._invalidate(display=True)
 		
 	@property
 	def underline_padding(self):
@@ -161,30 +213,156 @@ class KeyValue (ui.View):
 	
 	@underline_padding.setter
 	def underline_padding(self, value):
-		if type(value) is tuple and len(value) == 2:
-			x, y = value
-			if isinstance(x, (int, float)) and isinstance(y, (int, float)) and x >= 0 and y >= 0:
-				self._underline_padding = value
+		_validate('underline_padding', value)
+		self._underline_padding = value
+		self._invalidate(display=True)
+
+	def update(self, **props):
+		"""Validates every property first, then applies the ones
+		that changed with a single layout pass and redraw"""
+		if not props:
+			return
+		self._check_props(props)
+		with self.batch():
+			for attr, value in props.items():
+				current = getattr(self, attr)
+				if attr in _COLORS:
+					value = colors.parse(value)
+				if current != value:
+					setattr(self, attr, value)
+
+	def _check_props(self, props):
+		for attr, value in props.items():
+			if attr in _CHECKS:
+				_validate(attr, value)
+			elif not hasattr(self, attr):
+				raise AttributeError(f"KeyValue has no attribute '{attr}'")
+
+	def restyle(self, **props):
+		"""Theme hook; the same single pass as update(**props)"""
+		if props:
+			self.update(**props)
+
+	def feed(self, value=None, **props):
+		"""Thread-safe. Queues value (shown as value_text) and/or
+		props; only the latest of each is applied, at most once per
+		display frame. Props are validated here, on the caller's
+		thread, so a bad one raises to the feeder."""
+		if value is not None:
+			props['value_text'] = value if type(value) is str else str(value)
+		self._check_props(props)
+		with self._feed_lock:
+			stats = self.feed_stats
+			stats['fed'] += 1
+			if self._fed:
+				stats['coalesced'] += 1
+				stats['dropped'] += len(self._fed.keys() & props.keys())
+			self._fed.update(props)
+			start = not self._frames_running
+			self._frames_running = True
+		if start:
+			self._start_frames()
+
+	def bind(self, source, loop=None):
+		"""Feeds every item of the async iterator source, on loop,
+		the running loop, or a background loop (see background.run).
+		Returns the task or concurrent future."""
+		async def pump():
+			async for value in source:
+				self.feed(value)
+		return background.run(pump(), loop)
+
+	@on_main_thread
+	def _start_frames(self):
+		self._idle_frames = 0
+		ui.delay(self._feed_frame, 1. / self.frame_rate)
+
+	def _feed_frame(self):
+		# the stop decision is made under the lock, so a feed() racing
+		# with it either lands in this frame or starts the frames again
+		with self._feed_lock:
+			props, self._fed = self._fed, {}
+			if props:
+				self._idle_frames = 0
 			else:
-				_int_or_float_error("underline_padding", True)
-		else:
-			_int_or_float_error("underline_padding", True)
+				# stop after a second without values
+				self._idle_frames += 1
+				if self._idle_frames >= self.frame_rate:
+					self._frames_running = False
+			running = self._frames_running
+		try:
+			if props:
+				self.feed_stats['applied'] += 1
+				self.update(**props)
+		finally:
+			if running:
+				ui.delay(self._feed_frame, 1. / self.frame_rate)
+
+	@contextmanager
+	def batch(self):
+		"""Defers layout and redraw until the outermost batch exits"""
+		self._batch += 1
+		try:
+			yield self
+		finally:
+			try:
+				# layout runs while still batched, so a redraw it asks
+				# for joins the single one below
+				if self._batch == 1 and self._needs_layout:
+					self._needs_layout = False
+					self.layout()
+			finally:
+				self._batch -= 1
+			if not self._batch and self._needs_display:
+				self._needs_display = False
+				self._redraw_underline()
+
+	def _invalidate(self, layout=False, display=False):
+		if self._batch:
+			self._needs_layout |= layout
+			self._needs_display |= display
+		elif display:
+			self._redraw_underline()
+
+	def _underline_line(self):
+		x1, x2 = self.underline_padding
+		y = self.key_label.height - 2
+		return x1, y, self.width - x2, y, self.underline_width
+
+	def _redraw_underline(self):
+		# only the old and new underline need repainting, not the view
+		if not hasattr(self, 'key_label'):
+			return
+		rect = drawing.line_bounds(*self._underline_line())
+		drawn = self._underline.bounds()
+		if drawn:
+			rect = drawing.union(rect, drawn)
+		drawing.set_needs_display_in_rect(self, rect)
  
 	def draw(self):
-		underline = ui.Path()
-		x1, x2 = self.underline_padding
-		y = self.key_label.height
-		underline.move_to(x1, y - 2)
-		underline.line_to(self.width - x2, y - 2)
+		underline = self._underline.get(*self._underline_line())
 		ui.set_color(self.underline_color)
-		underline.line_width = self.underline_width
 		underline.stroke()
 
 	def layout(self):
-		self.key_label.size_to_fit()
-		self.value_label.size_to_fit()
+		# labels whose text and font are unchanged count as hits
+		before = measure.stats()
+		skipped = 0
+		for label in (self.key_label, self.value_label):
+			key = (label.text, label.font)
+			if self._measured.get(label.name) == key:
+				skipped += 1
+				continue
+			label.width, label.height = measure.measure_string(*key)
+			self._measured[label.name] = key
+		after = measure.stats()
+		self.layout_stats = {'hits': skipped + after['hits'] - before['hits'],
+												 'misses': after['misses'] - before['misses']}
 		self.key_label.x = self.key_padding
 		self.value_label.x = self.width - self.value_label.width - self.value_padding
+		# a new label height or view width moves the underline
+		if self._underline.key and self._underline.key != self._underline_line():
+			self._invalidate(display=True)
 			
 
 if __name__ == "__main__":
@@ -198,11 +376,10 @@ if __name__ == "__main__":
 	hex_wheel = "000000"
 	while root.on_screen:
 		num = int(hex_wheel, 16)
-		v.value_text = hex_wheel
-		v.value_font = (validator.FONT_FAMILIES[num % len(validator.FONT_FAMILIES)], 17)
-		v.value_color = '#' + hex_wheel
-		v.value_padding = num % 10
-		v.layout()
+		v.update(value_text=hex_wheel,
+						 value_font=(validator.FONT_FAMILIES[num % len(validator.FONT_FAMILIES)], 17),
+						 value_color='#' + hex_wheel,
+						 value_padding=num % 10)
 		hex_wheel = hex(num + 1)[2:].zfill(6)
 		time.sleep(0.1)
 		
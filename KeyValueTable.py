@@ -0,0 +1,140 @@
+import ui
+from math import ceil
+from ComboBox import CellPool
+from KeyValue import KeyValue, _validate
+
+
+STYLE_KEYS = ('key_font', 'key_color', 'key_padding',
+							'value_font', 'value_color', 'value_padding',
+							'underline_color', 'underline_width', 'underline_padding')
+
+"""KeyValueTable is a ui.View subclass showing many key/value
+rows styled like KeyValue. It is backed by a ui.TableView and
+only the visible rows are materialized as (pooled) KeyValues.
+Accepts all kwargs of ui.View, as well as:
+	data						 ->		Dict-like {key: value} or (keys, values) columns
+	row_height			 ->		Height of each row
+	any KeyValue style property (key_font, value_color, underline_width, ...)"""
+class KeyValueTable (ui.View):
+	def __init__(self, *args, **kwargs):
+		self.style = {k: kwargs.pop(k) for k in STYLE_KEYS if k in kwargs}
+		for attr, value in self.style.items():
+			_validate(attr, value)
+		row_height = kwargs.pop('row_height', 30)
+		data = kwargs.pop('data', {})
+		kwargs.setdefault('bg_color', 'white')
+		ui.View.__init__(self, *args, **kwargs)
+
+		self.pool = CellPool(0, self._make_cell)
+		self.table = ui.TableView(name='table',
+															frame=self.bounds,
+															flex='WH',
+															row_height=row_height,
+															allows_selection=False,
+															data_source=self)
+		self.add_subview(self.table)
+		self.layout()
+		self.data = data
+
+	@property
+	def data(self):
+		return dict(zip(self.keys, self.values))
+
+	@data.setter
+	def data(self, value):
+		if type(value) is tuple and len(value) == 2:
+			keys, values = value
+			if len(keys) != len(values):
+				raise ValueError('keys and values must be the same length')
+			values = values if type(values) is list else list(values)
+		else:
+			keys = list(value.keys())
+			values = [value[k] for k in keys]
+		self.keys = keys
+		self.values = values
+		self.rows = {k: i for i, k in enumerate(keys)}
+		self.pool.recycle()
+		self.table.reload()
+
+	@property
+	def row_height(self):
+		return self.table.row_height
+
+	@row_height.setter
+	def row_height(self, value):
+		self.table.row_height = value
+		self.layout()
+
+	def value(self, key):
+		return self.values[self.rows[key]]
+
+	def set_value(self, key, value):
+		"""Sets the value of key, redrawing its row only if it is on screen"""
+		row = self.rows[key]
+		self.values[row] = value
+		cell = self.pool.cells.get(row)
+		if cell is not None:
+			self._key_value(cell).update(value_text=str(value))
+
+	def update_values(self, values):
+		for key, value in values.items():
+			self.set_value(key, value)
+
+	def set_style(self, **props):
+		"""Restyles every row; offscreen rows are styled when reused"""
+		for attr, value in props.items():
+			if attr not in STYLE_KEYS:
+				raise AttributeError(f"'{attr}' is not a KeyValue style property")
+			_validate(attr, value)
+		self.style.update(props)
+		for cell in list(self.pool.cells.values()) + self.pool.free:
+			self._key_value(cell).update(**props)
+
+	restyle = set_style
+
+	def layout(self):
+		self.pool.capacity = ceil(self.height / self.row_height) + CellPool.MARGIN
+
+	def _make_cell(self):
+		cell = ui.TableViewCell()
+		cell.selectable = False
+		kv = KeyValue(frame=(0, 0, self.width, self.row_height), flex='W')
+		kv.update(**self.style)
+		cell.content_view.add_subview(kv)
+		return cell
+
+	@staticmethod
+	def _key_value(cell):
+		return cell.content_view.subviews[0]
+
+	def tableview_number_of_sections(self, tableview):
+		return 1
+
+	def tableview_number_of_rows(self, tableview, section):
+		return len(self.keys)
+
+	def tableview_cell_for_row(self, tableview, section, row):
+		cell, configured = self.pool.get(row)
+		if not configured:
+			self._key_value(cell).update(key_text=str(self.keys[row]),
+																	 value_text=str(self.values[row]))
+		return cell
+
+	def tableview_can_delete(self, tableview, section, row):
+		return False
+
+	def tableview_can_move(self, tableview, section, row):
+		return False
+
+
+if __name__ == "__main__":
+	import random
+	import time
+	rows = 5000
+	table = KeyValueTable(data={f'sensor {i}': 0 for i in range(rows)},
+												value_color='#1f5f8f',
+												frame=(0, 0, 320, 480))
+	table.present('sheet')
+	while table.on_screen:
+		table.set_value(f'sensor {random.randrange(rows)}', f'{random.random():.4f}')
+		time.sleep(0.01)
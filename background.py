@@ -0,0 +1,29 @@
+import asyncio
+import threading
+
+
+_loop = None
+_lock = threading.Lock()
+
+
+def event_loop():
+	"""A private event loop running on a daemon thread, started on
+	first use. Pythonista UI code has no loop of its own."""
+	global _loop
+	with _lock:
+		if _loop is None:
+			_loop = asyncio.new_event_loop()
+			threading.Thread(target=_loop.run_forever, daemon=True).start()
+		return _loop
+
+
+def run(coro, loop=None):
+	"""Schedules coro on loop, else on the calling thread's running
+	loop, else on the private background loop. Returns a task or a
+	concurrent future; either can be cancelled."""
+	if loop is None:
+		try:
+			return asyncio.get_running_loop().create_task(coro)
+		except RuntimeError:
+			loop = event_loop()
+	return asyncio.run_coroutine_threadsafe(coro, loop)
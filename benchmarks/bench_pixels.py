@@ -0,0 +1,37 @@
+"""Compares handing a 256x256 RGBA texture to ui through
+Joystick.array2ui against the PNG round-trip of pil2ui.
+
+Runs on Linux with the headless ui/objc_util backend. Its
+CoreGraphics calls only hand out handles, as the real ones
+only wrap the buffer, and ui.Image.from_data does not decode,
+so the difference shown is the PNG encode alone; on device
+array2ui also saves the decode. Usage: python benchmarks/bench_pixels.py"""
+import os
+import sys
+import timeit
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import headless  # noqa: E402
+headless.install()
+
+
+def main(number=200):
+	import Joystick
+
+	arr = np.zeros((256, 256, 4), np.uint8)
+	arr[64:192, 64:192] = (30, 144, 255, 255)
+	pil2ui = Joystick.Joystick.joystickImage.pil2ui
+	timings = {
+		"pil2ui": timeit.timeit(lambda: pil2ui(Image.fromarray(arr)), number=number),
+		"array2ui": timeit.timeit(lambda: Joystick.array2ui(arr), number=number),
+	}
+	for name, total in timings.items():
+		print(f"{name:>10}: {total / number * 1e6:10.1f} us/image")
+	print(f"   speedup: {timings['pil2ui'] / timings['array2ui']:10.1f}x")
+
+
+if __name__ == "__main__":
+	main()
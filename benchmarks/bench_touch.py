@@ -0,0 +1,32 @@
+"""Per-event cost of Joystick.touch_moved on the headless backend,
+with a fresh ui.Point per event and with reuse_vector=True.
+Usage: python benchmarks/bench_touch.py"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import headless  # noqa: E402
+headless.install()
+
+
+def main(events=20000):
+	import ui
+	import Joystick
+
+	touches = [ui.Touch((50 + 70 * (i % 7) / 7., 50 - 40 * (i % 5) / 5.)) for i in range(100)]
+	for reuse in (False, True):
+		stick = Joystick.Joystick(frame=(0, 0, 100, 100), reuse_vector=reuse)
+		stick.action = lambda vec: None
+
+		def run(n=events):
+			for i in range(n):
+				stick.touch_moved(touches[i % 100])
+		run(1000)
+		seconds = min(timeit.repeat(run, number=1, repeat=5))
+		label = "reuse_vector" if reuse else "ui.Point"
+		print(f"{label:>12}: {seconds / events * 1e6:7.3f} us/event")
+
+
+if __name__ == "__main__":
+	main()
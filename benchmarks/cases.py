@@ -0,0 +1,119 @@
+"""Benchmark cases for the widget hot paths.
+
+Each case is a setup function registered with @case. It
+builds its fixtures and returns the operation to time; the
+runner calls that operation repeatedly. Cases run against
+the headless ui backend, which must be installed before this
+module is imported."""
+import string
+
+import ui
+
+
+CASES = {}
+
+
+def case(name, params=(None,)):
+	def register(setup):
+		for param in params:
+			key = name if param is None else f'{name}[{param}]'
+			CASES[key] = (setup, param)
+		return setup
+	return register
+
+
+def _choices(n):
+	return [f'{string.ascii_letters[i % 52]} choice {i}' for i in range(n)]
+
+
+@case('combobox_construct', params=(10, 1000, 100000))
+def combobox_construct(n):
+	import ComboBox
+	root = ui.View(frame=(0, 0, 800, 600))
+	choices = _choices(n)
+	return lambda: ComboBox.ComboBox(root, choices=choices, frame=(10, 10, 200, 40))
+
+
+@case('combobox_layout', params=(10, 1000, 100000))
+def combobox_layout(n):
+	import ComboBox
+	root = ui.View(frame=(0, 0, 800, 600))
+	combo = ComboBox.ComboBox(root, choices=_choices(n), frame=(10, 10, 200, 40))
+	return combo.layout
+
+
+@case('combobox_scroll')
+def combobox_scroll(_):
+	import ComboBox
+	root = ui.View(frame=(0, 0, 800, 600))
+	combo = ComboBox.ComboBox(root, choices=_choices(5000), frame=(10, 10, 200, 40))
+	table = combo.dropbox
+	offsets = [i * table.row_height / 4 for i in range(4 * 500)]
+
+	def scroll():
+		for offset in offsets:
+			table.scroll_to(offset)
+	return scroll
+
+
+@case('joystick_touch_moved', params=('point', 'reuse'))
+def joystick_touch_moved(vector):
+	import Joystick
+	stick = Joystick.Joystick(frame=(0, 0, 100, 100), reuse_vector=vector == 'reuse')
+	stick.action = lambda vec: None
+	touches = [ui.Touch((50 + 60 * (i % 7) / 7., 50 - 30 * (i % 5) / 5.)) for i in range(1000)]
+
+	def move():
+		for touch in touches:
+			stick.touch_moved(touch)
+	return move
+
+
+@case('joystick_texture')
+def joystick_texture(_):
+	import Joystick
+	root = ui.View(frame=(0, 0, 800, 600))
+	stick = Joystick.Joystick(frame=(0, 0, 100, 100), texture_color='#1e90ff')
+	root.add_subview(stick)
+
+	def draw():
+		Joystick.textures.clear()
+		stick.stick.draw()
+	return draw
+
+
+@case('joystick_texture_cached')
+def joystick_texture_cached(_):
+	import Joystick
+	stick = Joystick.Joystick(frame=(0, 0, 100, 100), texture_color='#1e90ff')
+	stick.stick.draw()
+	return stick.stick.draw
+
+
+@case('keyvalue_update')
+def keyvalue_update(_):
+	import KeyValue
+	kv = KeyValue.KeyValue(frame=(0, 0, 150, 30))
+	values = [hex(i)[2:].zfill(6) for i in range(100)]
+
+	def cycle():
+		for i, value in enumerate(values):
+			kv.value_text = value
+			kv.value_color = '#' + value
+			kv.value_padding = i % 10
+			kv.layout()
+	return cycle
+
+
+@case('validate_font')
+def validate_font(_):
+	import validator
+	fonts = [('Menlo', 12), ('<System>', 17), ('Nope', 3), ('Arial', 0)] * 25
+	return lambda: [validator.validate_font(i) for i in fonts]
+
+
+@case('validate_color')
+def validate_color(_):
+	import validator
+	values = ['#95ffb4', '#95FFB4ff', 'blue', 'bleu', (1, 0, 0), None, '#xyzxyz'] * 15
+	return lambda: [validator.validate_color(i) for i in values]
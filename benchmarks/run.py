@@ -0,0 +1,88 @@
+"""Runs the widget benchmarks on the headless backend.
+
+	python benchmarks/run.py                    # run and compare with the baseline
+	python benchmarks/run.py --save             # run and store as the new baseline
+	python benchmarks/run.py -k combobox        # only cases whose name contains 'combobox'
+
+Every case records the best time per call and the headless
+counters (bridge calls, allocations, measurements, ...) of a
+single call. A case regresses when its time grows by more than
+--threshold over the baseline, or when any counter grows.
+Timings are machine specific, so keep baselines per machine.
+Exits with status 1 when a regression is found."""
+import argparse
+import json
+import os
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+
+sys.path.insert(0, ROOT)
+import headless  # noqa: E402
+headless.install()
+from benchmarks.cases import CASES  # noqa: E402
+
+
+def measure(setup, param, min_time=.2, repeat=7):
+	op = setup(param)
+	headless.reset()
+	op()
+	counters = dict(headless.counters)
+	timer = timeit.Timer(op)
+	number, _ = timer.autorange()
+	number = max(1, int(number * min_time / .2))
+	best = min(timer.repeat(repeat=repeat, number=number)) / number
+	return {'seconds': best, 'counters': counters}
+
+
+def compare(results, baseline, threshold):
+	regressions = []
+	for name, result in results.items():
+		base = baseline.get(name)
+		if base is None:
+			continue
+		ratio = result['seconds'] / base['seconds']
+		if ratio > 1 + threshold:
+			regressions.append(f'{name}: {ratio:.2f}x slower than baseline')
+		for key, count in result['counters'].items():
+			before = base['counters'].get(key, 0)
+			if count > before:
+				regressions.append(f'{name}: {key} {before} -> {count}')
+	return regressions
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+	parser.add_argument('-k', dest='pattern', default='', help='only run matching cases')
+	parser.add_argument('--save', action='store_true', help='store results as the baseline')
+	parser.add_argument('--baseline', default=BASELINE, help='baseline JSON file')
+	parser.add_argument('--threshold', type=float, default=.2,
+											help='allowed slowdown before flagging, as a fraction')
+	args = parser.parse_args(argv)
+
+	results = {}
+	for name, (setup, param) in CASES.items():
+		if args.pattern in name:
+			results[name] = measure(setup, param)
+			print(f'{name:<32} {results[name]["seconds"] * 1e3:12.4f} ms')
+
+	baseline = {}
+	if os.path.exists(args.baseline):
+		with open(args.baseline) as f:
+			baseline = json.load(f)
+	if args.save:
+		baseline.update(results)
+		with open(args.baseline, 'w') as f:
+			json.dump(baseline, f, indent=1, sort_keys=True)
+		print(f'baseline saved to {args.baseline}')
+		return 0
+	regressions = compare(results, baseline, args.threshold)
+	for line in regressions:
+		print('REGRESSION', line)
+	return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+	sys.exit(main())
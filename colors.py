@@ -0,0 +1,60 @@
+"""Shared color parsing. Every color is parsed once into a
+normalized (r, g, b, a) tuple of floats and memoized, so
+validation and the widgets' color setters share the result."""
+import ui
+import objc_util as objc
+from functools import lru_cache
+
+
+UIColor = objc.ObjCClass('UIColor')
+
+HEX_DIGITS = frozenset('0123456789abcdefABCDEF')
+
+
+def parse(value):
+	"""Normalized RGBA tuple for anything ui.parse_color takes: a hex
+	string ('#rgb', '#rgba', '#rrggbb' or '#rrggbbaa'), a color name,
+	an RGB(A) tuple or list of 0-1 floats, a 0-1 gray level or None
+	(transparent). Raises ValueError otherwise."""
+	try:
+		rgba = _parse(_hashable(value))
+	except TypeError:
+		rgba = None
+	if rgba is None:
+		raise ValueError(f'Invalid color: {value!r}')
+	return rgba
+
+
+def is_valid(value):
+	try:
+		return _parse(_hashable(value)) is not None
+	except TypeError:
+		return False
+
+
+def _hashable(value):
+	return tuple(value) if type(value) is list else value
+
+
+@lru_cache(maxsize=1024, typed=True)
+def _parse(value):
+	if value is None:
+		return (0., 0., 0., 0.)
+	if type(value) is str:
+		if value[:1] == '#':
+			digits = value[1:]
+			if len(digits) in (3, 4):
+				digits = ''.join(i * 2 for i in digits)
+			if len(digits) in (6, 8) and all(i in HEX_DIGITS for i in digits):
+				rgba = [int(digits[i:i + 2], 16) / 255. for i in range(0, len(digits), 2)]
+				return tuple(rgba + [1.] * (4 - len(rgba)))
+		elif value and UIColor.colorWithName_(value):
+			return tuple(ui.parse_color(value))
+	elif type(value) in (int, float):
+		if 0 <= value <= 1:
+			return (float(value),) * 3 + (1.,)
+	elif type(value) is tuple:
+		if 3 <= len(value) <= 4 and all(isinstance(i, (int, float)) for i in value):
+			if all(0 <= i <= 1 for i in value):
+				return tuple(float(i) for i in value) + (1.,) * (4 - len(value))
+	return None
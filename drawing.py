@@ -0,0 +1,47 @@
+import ui
+from objc_util import CGRect, CGPoint, CGSize
+
+
+def set_needs_display_in_rect(view, rect):
+	"""Marks only rect (x, y, w, h) of view for redraw"""
+	x, y, w, h = rect
+	view.objc_instance.setNeedsDisplayInRect_(CGRect(CGPoint(x, y), CGSize(w, h)))
+
+
+def line_bounds(x1, y1, x2, y2, width, margin=1):
+	"""Rect a line covers when stroked with width"""
+	pad = width / 2. + margin
+	return (min(x1, x2) - pad, min(y1, y2) - pad,
+					abs(x2 - x1) + 2 * pad, abs(y2 - y1) + 2 * pad)
+
+
+def union(a, b):
+	"""Smallest (x, y, w, h) rect containing both a and b"""
+	x, y = min(a[0], b[0]), min(a[1], b[1])
+	return (x, y,
+					max(a[0] + a[2], b[0] + b[2]) - x,
+					max(a[1] + a[3], b[1] + b[3]) - y)
+
+
+class LinePath (object):
+	"""A straight ui.Path rebuilt only when its end points or
+	line width change"""
+	def __init__(self):
+		self.key = None
+		self.path = None
+		self.builds = 0
+
+	def get(self, x1, y1, x2, y2, width):
+		key = (x1, y1, x2, y2, width)
+		if key != self.key:
+			self.path = ui.Path()
+			self.path.move_to(x1, y1)
+			self.path.line_to(x2, y2)
+			self.path.line_width = width
+			self.key = key
+			self.builds += 1
+		return self.path
+
+	def bounds(self):
+		"""Rect of the last built line, or None before the first"""
+		return line_bounds(*self.key) if self.key else None
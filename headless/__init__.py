@@ -0,0 +1,69 @@
+"""Headless stand-ins for Pythonista's ui and objc_util.
+
+Implements the subset of both modules the widgets in this
+repo use, so they can be imported, driven and profiled on a
+plain Linux box. Nothing is drawn; instead every bridge call,
+allocation, redraw request and text measurement is counted in
+`counters`, which is deterministic across runs.
+
+	import headless
+	headless.install()			# before importing any widget
+	import ComboBox
+	...
+	print(headless.counters)"""
+import sys
+from collections import Counter
+
+
+counters = Counter()
+
+# Pythonista resolves these prefixes to its bundled icon sets
+ICON_PREFIXES = ('iob:', 'iow:', 'ionicons-', 'typb:', 'typw:', 'emj:')
+
+
+def reset():
+	"""Zeroes every counter"""
+	counters.clear()
+
+
+def install(pil=True):
+	"""Registers the stand-ins as the ui and objc_util modules.
+	With pil, PIL.Image.open also resolves Pythonista icon names
+	(e.g. 'iow:pinpoint_256') to a synthetic white glyph."""
+	from headless import objc_util, ui
+	sys.modules['objc_util'] = objc_util
+	sys.modules['ui'] = ui
+	if pil:
+		_patch_pil()
+
+
+def icon_pixels(name):
+	"""uint8 RGBA glyph standing in for a bundled icon: a white
+	disc with an antialiased edge on a transparent background"""
+	import numpy as np
+	digits = ''.join(i for i in name.rsplit('_', 1)[-1] if i.isdigit())
+	size = int(digits) if digits else 32
+	yy, xx = np.mgrid[:size, :size]
+	r = np.hypot(xx - (size - 1) / 2, yy - (size - 1) / 2)
+	alpha = np.clip(size * .4 - r + .5, 0, 1)
+	arr = np.full((size, size, 4), 255, np.uint8)
+	arr[..., 3] = (alpha * 255).round().astype(np.uint8)
+	return arr
+
+
+def _patch_pil():
+	try:
+		from PIL import Image
+	except ImportError:
+		return
+	if getattr(Image.open, 'headless', False):
+		return
+	pil_open = Image.open
+
+	def open_(fp, *args, **kwargs):
+		if isinstance(fp, str) and fp.startswith(ICON_PREFIXES):
+			counters['icon_load'] += 1
+			return Image.fromarray(icon_pixels(fp))
+		return pil_open(fp, *args, **kwargs)
+	open_.headless = True
+	Image.open = open_
@@ -0,0 +1,110 @@
+"""Headless stand-in for Pythonista's objc_util.
+Every message sent to an ObjC object counts as a bridge call."""
+import ctypes
+from collections import namedtuple
+from headless import counters
+
+
+CGPoint = namedtuple('CGPoint', 'x y')
+CGSize = namedtuple('CGSize', 'width height')
+CGRect = namedtuple('CGRect', 'origin size')
+UIEdgeInsets = namedtuple('UIEdgeInsets', 'top left bottom right', defaults=(0, 0, 0, 0))
+
+FONT_FAMILIES = ('Arial', 'Arial Rounded MT Bold', 'Courier', 'Helvetica',
+								 'Menlo', 'Times New Roman')
+
+NAMED_COLORS = {
+	'black': (0., 0., 0., 1.), 'white': (1., 1., 1., 1.),
+	'red': (1., 0., 0., 1.), 'green': (0., 1., 0., 1.), 'blue': (0., 0., 1., 1.),
+	'yellow': (1., 1., 0., 1.), 'orange': (1., .5, 0., 1.),
+	'purple': (.5, 0., .5, 1.), 'grey': (.5, .5, .5, 1.), 'gray': (.5, .5, .5, 1.),
+	'clear': (0., 0., 0., 0.),
+}
+
+
+class NSString (object):
+	def __init__(self, value):
+		self.value = value
+
+	def cString(self):
+		return self.value.encode()
+
+	def __str__(self):
+		return self.value
+
+
+def _family_names():
+	return [NSString(i) for i in FONT_FAMILIES]
+
+
+def _color_with_name(name):
+	name = str(name)
+	return ObjCInstance(name) if name.lower() in NAMED_COLORS else None
+
+
+# selectors with a meaningful return value; all others return a proxy
+_RESULTS = {
+	'familyNames': _family_names,
+	'colorWithName_': _color_with_name,
+	'name': lambda: None,
+}
+
+
+class ObjCInstance (object):
+	"""Proxy for an ObjC object; any method can be called on it"""
+	def __init__(self, ptr=None):
+		self.ptr = ptr
+
+	def __getattr__(self, selector):
+		if selector.startswith('__'):
+			raise AttributeError(selector)
+
+		def send(*args):
+			counters['bridge'] += 1
+			counters['bridge.' + selector] += 1
+			result = _RESULTS.get(selector)
+			if result is not None:
+				return result(*args)
+			return ObjCInstance()
+		return send
+
+	def __bool__(self):
+		return True
+
+
+class ObjCClass (ObjCInstance):
+	def __init__(self, name):
+		ObjCInstance.__init__(self)
+		self.name = name
+		counters['objc_class'] += 1
+
+
+def on_main_thread(func):
+	"""There is no main thread to hop to; calls run in place"""
+	return func
+
+
+class _CFunction (object):
+	"""ctypes-like C function returning a fresh non-null handle"""
+	def __init__(self, name):
+		self.name = name
+		self.argtypes = None
+		self.restype = ctypes.c_void_p
+		self._handles = 0
+
+	def __call__(self, *args):
+		counters['c.' + self.name] += 1
+		self._handles += 1
+		return self._handles
+
+
+class _CLibrary (object):
+	def __getattr__(self, name):
+		if name.startswith('__'):
+			raise AttributeError(name)
+		fn = _CFunction(name)
+		setattr(self, name, fn)
+		return fn
+
+
+c = _CLibrary()
@@ -0,0 +1,584 @@
+"""Headless stand-in for Pythonista's ui module.
+Views keep their geometry and properties in Python. Nothing
+is rendered: redraw requests, draws, reloads, measurements
+and allocations are counted in headless.counters."""
+import math
+from headless import counters
+from headless.objc_util import NAMED_COLORS, ObjCInstance
+
+
+ALIGN_LEFT = 0
+ALIGN_CENTER = 1
+ALIGN_RIGHT = 2
+ALIGN_JUSTIFIED = 3
+ALIGN_NATURAL = 4
+
+DEFAULT_FONT = ('<System>', 17)
+
+
+class Point (object):
+	__slots__ = ('x', 'y')
+
+	def __init__(self, x=0., y=0.):
+		self.x = x
+		self.y = y
+
+	def __iter__(self):
+		yield self.x
+		yield self.y
+
+	def __len__(self):
+		return 2
+
+	def __getitem__(self, i):
+		return (self.x, self.y)[i]
+
+	def __eq__(self, other):
+		try:
+			x, y = other
+		except (TypeError, ValueError):
+			return NotImplemented
+		return self.x == x and self.y == y
+
+	def __add__(self, other):
+		x, y = _pair(other)
+		return Point(self.x + x, self.y + y)
+
+	__radd__ = __add__
+
+	def __sub__(self, other):
+		x, y = _pair(other)
+		return Point(self.x - x, self.y - y)
+
+	def __rsub__(self, other):
+		x, y = _pair(other)
+		return Point(x - self.x, y - self.y)
+
+	def __mul__(self, other):
+		x, y = _pair(other)
+		return Point(self.x * x, self.y * y)
+
+	__rmul__ = __mul__
+
+	def __truediv__(self, other):
+		x, y = _pair(other)
+		return Point(self.x / x, self.y / y)
+
+	def __neg__(self):
+		return Point(-self.x, -self.y)
+
+	def __abs__(self):
+		return math.hypot(self.x, self.y)
+
+	def __repr__(self):
+		return f'Point({self.x}, {self.y})'
+
+
+Vector = Point
+
+
+def _pair(value):
+	if isinstance(value, (int, float)):
+		return value, value
+	x, y = value
+	return x, y
+
+
+class Size (Point):
+	__slots__ = ()
+	w = property(lambda self: self.x)
+	h = property(lambda self: self.y)
+
+
+class Rect (object):
+	__slots__ = ('x', 'y', 'w', 'h')
+
+	def __init__(self, x=0., y=0., w=0., h=0.):
+		self.x, self.y, self.w, self.h = x, y, w, h
+
+	width = property(lambda self: self.w)
+	height = property(lambda self: self.h)
+	origin = property(lambda self: Point(self.x, self.y))
+	size = property(lambda self: Size(self.w, self.h))
+
+	def __iter__(self):
+		return iter((self.x, self.y, self.w, self.h))
+
+	def __len__(self):
+		return 4
+
+	def __getitem__(self, i):
+		return (self.x, self.y, self.w, self.h)[i]
+
+	def __eq__(self, other):
+		try:
+			return tuple(self) == tuple(other)
+		except TypeError:
+			return NotImplemented
+
+	def center(self):
+		return Point(self.x + self.w / 2, self.y + self.h / 2)
+
+	def contains_point(self, point):
+		x, y = point
+		return self.x <= x < self.x + self.w and self.y <= y < self.y + self.h
+
+	def intersects(self, other):
+		x, y, w, h = other
+		return (self.x < x + w and x < self.x + self.w and
+						self.y < y + h and y < self.y + self.h)
+
+	def inset(self, top, left, bottom=None, right=None):
+		bottom = top if bottom is None else bottom
+		right = left if right is None else right
+		return Rect(self.x + left, self.y + top,
+								self.w - left - right, self.h - top - bottom)
+
+	def __repr__(self):
+		return f'Rect({self.x}, {self.y}, {self.w}, {self.h})'
+
+
+def parse_color(color):
+	"""RGBA tuple for a hex string, name, gray level or tuple.
+	Unknown values parse as transparent black, like on device."""
+	counters['parse_color'] += 1
+	if color is None:
+		return (0., 0., 0., 0.)
+	if isinstance(color, (int, float)):
+		return (float(color),) * 3 + (1.,)
+	if isinstance(color, str):
+		if color.startswith('#'):
+			digits = color[1:]
+			if len(digits) in (3, 4):
+				digits = ''.join(i * 2 for i in digits)
+			try:
+				rgba = [int(digits[i:i + 2], 16) / 255. for i in range(0, len(digits), 2)]
+			except ValueError:
+				return (0., 0., 0., 0.)
+			if len(rgba) in (3, 4):
+				return tuple(rgba + [1.] * (4 - len(rgba)))
+			return (0., 0., 0., 0.)
+		return NAMED_COLORS.get(color.lower(), (0., 0., 0., 0.))
+	rgba = tuple(float(i) for i in color)
+	return rgba + (1.,) * (4 - len(rgba))
+
+
+def measure_string(s, max_width=0, font=DEFAULT_FONT, alignment=ALIGN_LEFT,
+									 line_break_mode=0):
+	"""Deterministic metrics: each character is half the font
+	size wide and each line 1.2 font sizes tall"""
+	counters['measure_string'] += 1
+	size = font[1]
+	lines = s.split('\n') if s else ['']
+	w = max(len(i) for i in lines) * size * .5
+	if max_width and w > max_width:
+		lines = [None] * math.ceil(w / max_width)
+		w = max_width
+	return (w, len(lines) * size * 1.2)
+
+
+def set_color(color):
+	counters['set_color'] += 1
+
+
+def get_screen_size():
+	return Size(1024., 768.)
+
+
+def get_window_size():
+	return get_screen_size()
+
+
+_delays = []
+
+
+def delay(func, seconds):
+	"""Queued until run_delays() is called"""
+	counters['delay'] += 1
+	_delays.append(func)
+
+
+def cancel_delays():
+	_delays.clear()
+
+
+def run_delays():
+	"""Runs every queued delay, including ones queued meanwhile"""
+	while _delays:
+		_delays.pop(0)()
+
+
+def in_background(func):
+	return func
+
+
+def animate(animation, duration=.25, delay=0., completion=None):
+	animation()
+	if completion:
+		completion()
+
+
+class Touch (object):
+	"""Touch event as delivered to touch_began/moved/ended"""
+	def __init__(self, location, prev_location=None, touch_id=0,
+							 timestamp=0, phase='moved'):
+		self.location = Point(*location)
+		self.prev_location = Point(*(prev_location or location))
+		self.touch_id = touch_id
+		self.timestamp = timestamp
+		self.phase = phase
+		self.objc_instance = ObjCInstance()
+
+
+class Path (object):
+	def __init__(self):
+		counters['alloc.Path'] += 1
+		self.line_width = 1.
+		self.elements = []
+
+	@classmethod
+	def rect(cls, x, y, w, h):
+		p = cls()
+		p.elements.append(('rect', x, y, w, h))
+		return p
+
+	@classmethod
+	def oval(cls, x, y, w, h):
+		p = cls()
+		p.elements.append(('oval', x, y, w, h))
+		return p
+
+	@classmethod
+	def rounded_rect(cls, x, y, w, h, r):
+		p = cls()
+		p.elements.append(('rounded_rect', x, y, w, h, r))
+		return p
+
+	def move_to(self, x, y):
+		self.elements.append(('move_to', x, y))
+
+	def line_to(self, x, y):
+		self.elements.append(('line_to', x, y))
+
+	def close(self):
+		self.elements.append(('close',))
+
+	def stroke(self):
+		counters['stroke'] += 1
+
+	def fill(self):
+		counters['fill'] += 1
+
+
+class Image (object):
+	def __init__(self, name=None):
+		counters['alloc.Image'] += 1
+		self.name = name
+		self.size = Size(256., 256.) if name else Size()
+
+	@classmethod
+	def named(cls, name):
+		return cls(name)
+
+	@classmethod
+	def from_data(cls, data, scale=1.):
+		counters['image_from_data'] += 1
+		return cls()
+
+	def draw(self, x=0, y=0, w=None, h=None):
+		counters['image_draw'] += 1
+
+	def with_rendering_mode(self, mode):
+		return self
+
+
+class View (object):
+	def __new__(cls, *args, **kwargs):
+		# like the ObjC object behind a real view, properties work
+		# before __init__ runs
+		self = object.__new__(cls)
+		counters['alloc.' + cls.__name__] += 1
+		d = self.__dict__
+		d['_frame'] = Rect(0., 0., 100., 100.)
+		d['_bg_color'] = (0., 0., 0., 0.)
+		d['_tint_color'] = (0., .478, 1., 1.)
+		d['_border_color'] = (0., 0., 0., 1.)
+		d['border_width'] = 0.
+		d['corner_radius'] = 0.
+		d['name'] = None
+		d['hidden'] = False
+		d['alpha'] = 1.
+		d['flex'] = ''
+		d['touch_enabled'] = True
+		d['multitouch_enabled'] = False
+		d['update_interval'] = 0.
+		d['content_mode'] = 0
+		d['_subviews'] = []
+		d['superview'] = None
+		d['on_screen'] = False
+		d['objc_instance'] = ObjCInstance(self)
+		return self
+
+	def __init__(self, *args, **kwargs):
+		if args:
+			self.frame = args[0]
+		for k, v in kwargs.items():
+			setattr(self, k, v)
+
+	@property
+	def frame(self):
+		return Rect(*self._frame)
+
+	@frame.setter
+	def frame(self, value):
+		self._frame = Rect(*value)
+
+	@property
+	def bounds(self):
+		return Rect(0., 0., self._frame.w, self._frame.h)
+
+	@bounds.setter
+	def bounds(self, value):
+		x, y, w, h = value
+		self.width, self.height = w, h
+
+	def _set(self, i, value):
+		f = list(self._frame)
+		f[i] = value
+		self._frame = Rect(*f)
+
+	x = property(lambda self: self._frame.x, lambda self, v: self._set(0, v))
+	y = property(lambda self: self._frame.y, lambda self, v: self._set(1, v))
+	width = property(lambda self: self._frame.w, lambda self, v: self._set(2, v))
+	height = property(lambda self: self._frame.h, lambda self, v: self._set(3, v))
+
+	@property
+	def center(self):
+		return self._frame.center()
+
+	@center.setter
+	def center(self, value):
+		x, y = value
+		f = self._frame
+		self._frame = Rect(x - f.w / 2, y - f.h / 2, f.w, f.h)
+
+	@property
+	def bg_color(self):
+		return self._bg_color
+
+	@bg_color.setter
+	def bg_color(self, value):
+		self._bg_color = parse_color(value)
+
+	background_color = bg_color
+
+	@property
+	def tint_color(self):
+		return self._tint_color
+
+	@tint_color.setter
+	def tint_color(self, value):
+		self._tint_color = parse_color(value)
+
+	@property
+	def border_color(self):
+		return self._border_color
+
+	@border_color.setter
+	def border_color(self, value):
+		self._border_color = parse_color(value)
+
+	@property
+	def subviews(self):
+		return tuple(self._subviews)
+
+	def add_subview(self, view):
+		if view.superview is not None:
+			view.superview.remove_subview(view)
+		self._subviews.append(view)
+		view.superview = self
+
+	def remove_subview(self, view):
+		self._subviews.remove(view)
+		view.superview = None
+
+	def bring_to_front(self):
+		if self.superview:
+			subviews = self.superview._subviews
+			subviews.remove(self)
+			subviews.append(self)
+
+	def send_to_back(self):
+		if self.superview:
+			subviews = self.superview._subviews
+			subviews.remove(self)
+			subviews.insert(0, self)
+
+	def __getitem__(self, name):
+		for view in self._subviews:
+			if view.name == name:
+				return view
+		return None
+
+	def set_needs_display(self):
+		counters['set_needs_display'] += 1
+
+	def size_to_fit(self):
+		pass
+
+	def layout(self):
+		pass
+
+	def draw(self):
+		pass
+
+	def render(self):
+		"""Headless equivalent of a display pass: draws self and
+		then every visible subview"""
+		counters['draw'] += 1
+		self.draw()
+		for view in self._subviews:
+			if not view.hidden:
+				view.render()
+
+	def present(self, style='default', **kwargs):
+		counters['present'] += 1
+
+	def close(self):
+		self.on_screen = False
+
+	def wait_modal(self):
+		pass
+
+
+class Label (View):
+	def __new__(cls, *args, **kwargs):
+		self = View.__new__(cls)
+		d = self.__dict__
+		d['text'] = ''
+		d['font'] = DEFAULT_FONT
+		d['_text_color'] = (0., 0., 0., 1.)
+		d['alignment'] = ALIGN_LEFT
+		d['number_of_lines'] = 1
+		d['line_break_mode'] = 0
+		return self
+
+	@property
+	def text_color(self):
+		return self._text_color
+
+	@text_color.setter
+	def text_color(self, value):
+		self._text_color = parse_color(value)
+
+	def size_to_fit(self):
+		self.width, self.height = measure_string(self.text, font=self.font)
+
+
+class TextField (Label):
+	def __new__(cls, *args, **kwargs):
+		self = Label.__new__(cls)
+		d = self.__dict__
+		d['placeholder'] = ''
+		d['delegate'] = None
+		d['bordered'] = True
+		d['clear_button_mode'] = 'never'
+		d['editing'] = False
+		return self
+
+	def begin_editing(self):
+		self.editing = True
+
+	def end_editing(self):
+		self.editing = False
+
+	def type(self, text):
+		"""Headless helper: replaces the text and notifies the delegate
+		the way a keystroke does"""
+		self.text = text
+		if self.delegate and hasattr(self.delegate, 'textfield_did_change'):
+			self.delegate.textfield_did_change(self)
+
+
+class Button (View):
+	def __new__(cls, *args, **kwargs):
+		self = View.__new__(cls)
+		d = self.__dict__
+		d['title'] = ''
+		d['image'] = None
+		d['action'] = None
+		d['enabled'] = True
+		d['font'] = DEFAULT_FONT
+		return self
+
+	def tap(self):
+		"""Headless helper: fires the action like a tap would"""
+		if self.enabled and self.action:
+			self.action(self)
+
+
+class TableViewCell (View):
+	def __new__(cls, *args, **kwargs):
+		self = View.__new__(cls)
+		d = self.__dict__
+		d['text_label'] = Label()
+		d['detail_text_label'] = Label()
+		d['content_view'] = View(frame=(0, 0, 320, 44), flex='WH')
+		d['selectable'] = True
+		d['selected_background_view'] = None
+		d['accessory_type'] = None
+		return self
+
+
+class TableView (View):
+	def __new__(cls, *args, **kwargs):
+		self = View.__new__(cls)
+		d = self.__dict__
+		d['data_source'] = None
+		d['delegate'] = None
+		d['row_height'] = 44.
+		d['selected_row'] = (0, -1)
+		d['allows_selection'] = True
+		d['allows_multiple_selection'] = False
+		d['editing'] = False
+		return self
+
+	def reload(self):
+		counters['table_reload'] += 1
+
+	reload_data = reload
+
+	def insert_rows(self, rows, animated=True):
+		counters['table_insert_rows'] += len(rows)
+
+	def delete_rows(self, rows):
+		counters['table_delete_rows'] += len(rows)
+
+	def visible_rows(self, offset=0.):
+		"""Headless helper: rows on screen with the content scrolled
+		down by offset points"""
+		ds = self.data_source
+		count = ds.tableview_number_of_rows(self, 0) if ds else 0
+		first = int(offset // self.row_height)
+		last = int(math.ceil((offset + self.height) / self.row_height))
+		return range(max(first, 0), min(last, count))
+
+	def scroll_to(self, offset):
+		"""Headless helper: asks the data source for every row that
+		is visible at offset, like UITableView does while scrolling"""
+		return [self.data_source.tableview_cell_for_row(self, 0, row)
+						for row in self.visible_rows(offset)]
+
+
+class ImageContext (object):
+	def __init__(self, width, height, scale=0.):
+		self.size = Size(width, height)
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		pass
+
+	def get_image(self):
+		return Image()
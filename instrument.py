@@ -0,0 +1,114 @@
+"""Opt-in timing of the widgets' hot paths.
+
+	import instrument
+	instrument.enable()
+	...
+	print(instrument.stats())
+	instrument.export_chrome_trace('trace.json')	# chrome://tracing
+	instrument.disable()
+
+enable() swaps the listed methods for timing wrappers on
+their classes and disable() puts the originals back, so
+nothing is wrapped, and nothing costs, while disabled."""
+import importlib
+import json
+import os
+import threading
+import time
+from collections import deque
+from functools import wraps
+
+from touchlog import LatencyHistogram
+
+
+# (module, class path, method)
+TARGETS = (
+	('ComboBox', 'ComboBox', 'layout'),
+	('ComboBox', 'ComboBox', 'draw'),
+	('ComboBox', 'ComboBoxDataSource', 'tableview_cell_for_row'),
+	('Joystick', 'Joystick', 'touch_moved'),
+	('Joystick', 'Joystick.joystickImage', 'draw'),
+	('KeyValue', 'KeyValue', 'layout'),
+	('KeyValue', 'KeyValue', 'draw'),
+)
+
+_originals = {}
+_stats = {}
+_events = deque(maxlen=100000)
+_lock = threading.Lock()
+_epoch = time.perf_counter()
+
+
+def enabled():
+	return bool(_originals)
+
+
+def enable(targets=TARGETS, trace=True, max_events=100000):
+	"""Wraps targets; with trace, keeps the last max_events calls
+	for export_chrome_trace"""
+	global _events
+	_events = deque(_events, maxlen=max_events)
+	for module, path, method in targets:
+		cls = importlib.import_module(module)
+		for attr in path.split('.'):
+			cls = getattr(cls, attr)
+		key = (cls, method)
+		if key not in _originals:
+			original = cls.__dict__[method]
+			_originals[key] = original
+			setattr(cls, method, _wrap(original, f'{path}.{method}', trace))
+
+
+def disable():
+	for (cls, method), original in _originals.items():
+		setattr(cls, method, original)
+	_originals.clear()
+
+
+def reset():
+	with _lock:
+		_stats.clear()
+		_events.clear()
+
+
+def stats():
+	"""{(qualified method, instance label): call count and durations}"""
+	with _lock:
+		return {key: dict(h.summary(), total=h.total) for key, h in _stats.items()}
+
+
+def export_chrome_trace(path):
+	"""Writes the recorded calls in the Chrome trace event format"""
+	with _lock:
+		events = [{'name': name, 'cat': label, 'ph': 'X', 'ts': ts, 'dur': dur,
+							 'pid': os.getpid(), 'tid': tid, 'args': {'instance': label}}
+							for name, label, ts, dur, tid in _events]
+	with open(path, 'w') as f:
+		json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+
+def _label(instance):
+	name = getattr(instance, 'name', None)
+	cls = type(instance).__name__
+	return f'{cls} {name!r} @{id(instance):x}' if name else f'{cls} @{id(instance):x}'
+
+
+def _wrap(func, name, trace):
+	@wraps(func)
+	def timed(self, *args, **kwargs):
+		start = time.perf_counter()
+		try:
+			return func(self, *args, **kwargs)
+		finally:
+			end = time.perf_counter()
+			label = _label(self)
+			with _lock:
+				histogram = _stats.get((name, label))
+				if histogram is None:
+					histogram = _stats[(name, label)] = LatencyHistogram()
+				histogram.add(end - start)
+				if trace:
+					_events.append((name, label, (start - _epoch) * 1e6,
+													(end - start) * 1e6, threading.get_ident()))
+	timed.instrumented = True
+	return timed
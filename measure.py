@@ -0,0 +1,56 @@
+import ui
+from collections import Counter
+from functools import lru_cache
+
+
+@lru_cache(maxsize=65536)
+def measure_string(text, font):
+	"""ui.measure_string memoized on (text, font)"""
+	return ui.measure_string(text, font=font)
+
+
+def stats():
+	info = measure_string.cache_info()
+	return {'hits': info.hits, 'misses': info.misses, 'size': info.currsize}
+
+
+class SizeCache (object):
+	"""Measured sizes of a collection of strings in one font.
+	Keeps a running max width and height so adding or
+	removing k strings costs O(k) measurements."""
+	def __init__(self, font, strings=()):
+		self.font = font
+		self.widths = Counter()
+		self.heights = Counter()
+		self.max_width = 0
+		self.max_height = 0
+		self.add(strings)
+
+	def add(self, strings):
+		for s in strings:
+			w, h = measure_string(s, self.font)
+			self.widths[w] += 1
+			self.heights[h] += 1
+			self.max_width = max(self.max_width, w)
+			self.max_height = max(self.max_height, h)
+
+	def remove(self, strings):
+		for s in strings:
+			w, h = measure_string(s, self.font)
+			# rescan only when the last string of the max size goes
+			if self._discard(self.widths, w) and w == self.max_width:
+				self.max_width = max(self.widths, default=0)
+			if self._discard(self.heights, h) and h == self.max_height:
+				self.max_height = max(self.heights, default=0)
+
+	def reset(self, font, strings):
+		self.__init__(font, strings)
+
+	@staticmethod
+	def _discard(counter, key):
+		"""Drops one key; True if it was the last"""
+		counter[key] -= 1
+		if counter[key] <= 0:
+			del counter[key]
+			return True
+		return False
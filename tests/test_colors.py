@@ -0,0 +1,30 @@
+import pytest
+import colors
+
+
+@pytest.mark.parametrize('value, rgba', [
+	('#fff', (1., 1., 1., 1.)),
+	('#0f08', (0., 1., 0., 0x88 / 255.)),
+	('#ff0000', (1., 0., 0., 1.)),
+	([0, 0.5, 1], (0., .5, 1., 1.)),
+	((0, 0.5, 1, .25), (0., .5, 1., .25)),
+	(0.5, (.5, .5, .5, 1.)),
+	(1, (1., 1., 1., 1.)),
+	(None, (0., 0., 0., 0.)),
+])
+def test_parse_accepts_what_ui_parse_color_takes(value, rgba):
+	assert colors.parse(value) == pytest.approx(rgba)
+
+
+@pytest.mark.parametrize('value', ['#ff', '#ggg', 'ff0000', 2, True, (1, 2), [0, 0, 5]])
+def test_parse_rejects_invalid(value):
+	assert not colors.is_valid(value)
+	with pytest.raises(ValueError):
+		colors.parse(value)
+
+
+def test_bools_never_share_a_cache_entry_with_gray_levels():
+	assert not colors.is_valid(False)
+	assert colors.parse(0.0) == (0., 0., 0., 1.)
+	assert colors.parse(1.0) == (1., 1., 1., 1.)
+	assert not colors.is_valid(True)
@@ -0,0 +1,243 @@
+import asyncio
+import time
+import ui
+from ComboBox import ComboBox
+
+
+def wait_for(check, timeout=2.):
+	end = time.time() + timeout
+	while not check():
+		assert time.time() < end, 'timed out'
+		time.sleep(0.005)
+
+
+async def words(n):
+	await asyncio.sleep(0)
+	return ['w%d' % i for i in range(n)]
+
+
+def test_load_choices_without_running_loop():
+	cb = ComboBox(ui.View(), frame=(0, 0, 200, 30))
+	task = cb.load_choices(words(40), chunk_size=8)
+	task.result(2)
+	assert cb.choices == ['w%d' % i for i in range(40)]
+
+
+def test_loader_kwarg_without_running_loop():
+	cb = ComboBox(ui.View(), frame=(0, 0, 200, 30), choices=words(3))
+	wait_for(lambda: cb.choices == ['w0', 'w1', 'w2'])
+
+
+def test_load_choices_rejects_bad_source_before_touching_choices():
+	cb = ComboBox(ui.View(), frame=(0, 0, 200, 30), choices=['a', 'b'])
+	try:
+		cb.load_choices(['x'])
+	except TypeError:
+		pass
+	else:
+		assert False, 'expected TypeError'
+	assert cb.choices == ['a', 'b']
+
+
+class UpdatesChecker(object):
+	"""Stands in for the dropbox's UITableView and applies each
+	update block the way UIKit does: deletes and reloads against the
+	rows before the block, inserts against the rows after it"""
+	def __init__(self, combo):
+		self.combo = combo
+		self.rows = list(combo.choices)
+		self.blocks = 0
+		combo.dropbox.insert_rows = lambda rows, animated=True: self.inserts.extend(rows)
+		combo.dropbox.delete_rows = lambda rows: self.deletes.extend(rows)
+
+	def beginUpdates(self):
+		self.inserts, self.deletes, self.reloads = [], [], []
+
+	def reloadRowsAtIndexPaths_withRowAnimation_(self, paths, animation):
+		self.reloads.extend(row for row, section in paths)
+
+	def endUpdates(self):
+		self.blocks += 1
+		old, new = self.rows, self.combo.choices
+		for rows in (self.inserts, self.deletes, self.reloads):
+			assert len(set(rows)) == len(rows), 'duplicate index path'
+		assert all(0 <= i < len(old) for i in self.deletes + self.reloads)
+		assert not set(self.deletes) & set(self.reloads)
+		assert all(0 <= i < len(new) for i in self.inserts)
+		assert len(old) - len(self.deletes) + len(self.inserts) == len(new)
+		# survivors keep their text unless reloaded, inserts take theirs
+		kept = [i for i in range(len(old)) if i not in self.deletes]
+		slots = [i for i in range(len(new)) if i not in self.inserts]
+		rows = list(new)
+		for old_index, new_index in zip(kept, slots):
+			if old_index not in self.reloads:
+				rows[new_index] = old[old_index]
+		assert rows == new
+		self.rows = rows
+
+	def __getattr__(self, selector):
+		return lambda *args: None
+
+
+def test_update_choices_mixed_ops_map_onto_update_blocks(monkeypatch):
+	import ComboBox as module
+	monkeypatch.setattr(module.NSIndexPath, 'indexPathForRow_inSection_',
+											lambda row, section: (row, section), raising=False)
+	cb = ComboBox(ui.View(), frame=(0, 0, 200, 30),
+								choices=['a', 'b', 'c', 'd', 'e', 'f'])
+	checker = UpdatesChecker(cb)
+	cb.dropbox.objc_instance = checker
+	diffs = [
+		[('remove', 3), ('remove', 3)],
+		[('insert', 1, 'x'), ('insert', 1, 'y')],
+		[('remove', 2), ('replace', 2, 'z')],
+		[('replace', 0, 'p'), ('insert', 0, 'q'), ('remove', 4), ('replace', 0, 'r')],
+		[('insert', 0, 'm'), ('insert', 1, 'n'), ('remove', 6), ('remove', 5)],
+	]
+	for diff in diffs:
+		expected = list(cb.choices)
+		for op, index, *text in diff:
+			if op == 'insert':
+				expected.insert(index, text[0])
+			elif op == 'remove':
+				del expected[index]
+			else:
+				expected[index] = text[0]
+		cb.update_choices(diff)
+		assert cb.choices == expected
+		assert checker.rows == expected
+	# ops that agree under both readings share one block
+	blocks = checker.blocks
+	cb.update_choices([('insert', 0, 's'), ('insert', 1, 't'), ('insert', 5, 'u')])
+	assert checker.blocks == blocks + 1
+
+
+def test_cells_do_not_share_selected_background_views():
+	root = ui.View()
+	views = []
+	for _ in range(2):
+		cb = ComboBox(root, frame=(0, 0, 200, 30), choices=['a', 'b', 'c'],
+									highlight_color='red')
+		ds = cb.dropbox.data_source
+		for row in range(3):
+			ds.tableview_cell_for_row(cb.dropbox, 0, row)
+		views.extend(ds.highlights.values())
+	assert len(views) == 6
+	assert len(set(map(id, views))) == 6
+	cb.highlight_color = 'blue'
+	assert all(v.bg_color == (0., 0., 1., 1.) for v in ds.highlights.values())
+
+
+def test_mappings_are_not_choices():
+	try:
+		ComboBox(ui.View(), frame=(0, 0, 200, 30), choices={'a': 1})
+	except ValueError:
+		pass
+	else:
+		assert False, 'expected ValueError'
+
+
+def test_searchable_lazy_provider_needs_search():
+	from ComboBox import PagedChoices
+	fetched = []
+
+	def fetch(offset, limit):
+		fetched.append(offset)
+		return ['r%d' % i for i in range(offset, min(offset + limit, 1000))]
+	lazy = PagedChoices(1000, fetch)
+	try:
+		ComboBox(ui.View(), frame=(0, 0, 200, 30), choices=lazy, searchable=True)
+	except ValueError:
+		pass
+	else:
+		assert False, 'expected ValueError'
+	cb = ComboBox(ui.View(), frame=(0, 0, 200, 30), choices=lazy)
+	try:
+		cb.searchable = True
+	except ValueError:
+		pass
+	else:
+		assert False, 'expected ValueError'
+	assert len(fetched) == 1
+	searchable = PagedChoices(1000, fetch, search=lambda q: [0])
+	cb = ComboBox(ui.View(), frame=(0, 0, 200, 30), choices=searchable, searchable=True)
+	cb.filter('r0')
+	assert cb.dropbox.data_source.rows == [0]
+
+
+def test_restyle_bg_color_reaches_the_dropbox():
+	cb = ComboBox(ui.View(), frame=(0, 0, 200, 30), choices=['a', 'b'])
+	cb.restyle(bg_color='black', text_color='white')
+	assert cb.bg_color == (0., 0., 0., 1.)
+	assert cb.dropbox.bg_color == (0., 0., 0., 1.)
+	assert cb.dropbox.data_source.bg_color == (0., 0., 0., 1.)
+
+
+def test_loader_holds_selected_index_until_its_row_arrives():
+	rows = ['r%d' % i for i in range(20)]
+	cb = ComboBox(ui.View(), frame=(0, 0, 200, 30), selected_index=7,
+								choices=lambda: iter(rows))
+	wait_for(lambda: cb.selected_text == 'r7')
+	assert cb.choices == rows
+	assert cb.selected_index == 7
+	assert cb.dropbox.data_source.selected_row == 7
+
+
+def test_loader_clamps_a_selected_index_past_the_end():
+	cb = ComboBox(ui.View(), frame=(0, 0, 200, 30), selected_index=9,
+								choices=lambda: iter(['a', 'b']))
+	wait_for(lambda: cb.selected_text == 'b')
+	assert cb.choices == ['a', 'b']
+	assert cb.selected_index == 1
+
+
+def test_choice_index_follows_edits():
+	import random
+	from ComboBox import ChoiceIndex
+	rng = random.Random(4)
+	words = ['apple', 'grape', 'Maple', 'pear', 'plum', 'apricot', 'Peach']
+	choices = [rng.choice(words) for _ in range(30)]
+	index = ChoiceIndex(choices)
+	for _ in range(200):
+		op = rng.choice(('insert', 'remove', 'replace'))
+		i = rng.randrange(len(choices) + (op == 'insert'))
+		text = rng.choice(words) + str(rng.randrange(3))
+		if op == 'insert':
+			choices.insert(i, text)
+			index.insert(i, text)
+		elif op == 'remove' and len(choices) > 1:
+			del choices[i]
+			index.remove(i)
+		elif op == 'replace':
+			choices[i] = text
+			index.replace(i, text)
+		for query in ('p', 'ap', 'ple', 'apri', 'each1'):
+			expected = [n for n, c in enumerate(choices) if query in c.lower()]
+			assert index.search(query) == expected
+
+
+def test_update_choices_patches_filtered_rows_without_reindexing(monkeypatch):
+	import random
+	import ComboBox as module
+	rng = random.Random(7)
+	words = ['apple', 'grape', 'maple', 'pear', 'plum']
+	cb = ComboBox(ui.View(), frame=(0, 0, 200, 30), searchable=True,
+								choices=[rng.choice(words) for _ in range(40)])
+	cb.filter('ple')
+	built = []
+	monkeypatch.setattr(module, 'ChoiceIndex',
+											lambda choices: built.append(1) or module.ChoiceIndex(choices))
+	for _ in range(100):
+		count = len(cb.choices)
+		op = rng.choice(('insert', 'remove', 'replace'))
+		if op == 'insert':
+			diff = [('insert', rng.randrange(count + 1), rng.choice(words))]
+		elif op == 'remove' and count > 1:
+			diff = [('remove', rng.randrange(count))]
+		else:
+			diff = [('replace', rng.randrange(count), rng.choice(words))]
+		cb.update_choices(diff)
+		expected = [n for n, c in enumerate(cb.choices) if 'ple' in c]
+		assert cb.dropbox.data_source.rows == expected
+		assert cb._index.search('ple') == expected
+	assert built == []
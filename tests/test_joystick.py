@@ -0,0 +1,120 @@
+import gc
+import asyncio
+import threading
+import pytest
+import ui
+from Joystick import Joystick, Dispatcher
+
+
+def test_discarded_joystick_stops_its_dispatch_thread():
+	stick = Joystick(dispatch_rate=60, dispatch_target="thread")
+	worker = stick.dispatcher._worker
+	del stick
+	gc.collect()
+	worker.join(1)
+	assert not worker.is_alive()
+
+
+def test_closing_keeps_the_dispatcher():
+	stick = Joystick(dispatch_rate=60, dispatch_target="thread")
+	dispatcher = stick.dispatcher
+	stick.close()
+	assert stick.dispatcher is dispatcher
+	assert dispatcher._worker.is_alive()
+	stick.set_dispatch(None)
+
+
+class Clock(object):
+	def __init__(self):
+		self.now = 100.
+
+	def __call__(self):
+		return self.now
+
+
+def ui_dispatcher(monkeypatch, **kwargs):
+	"""Dispatcher on the ui.delay target with a fake clock; returns
+	(dispatcher, delivered vectors, clock, queued (func, wait) delays)"""
+	import Joystick as module
+	clock = Clock()
+	delays = []
+	monkeypatch.setattr(module.time, 'perf_counter', clock)
+	monkeypatch.setattr(module.ui, 'delay', lambda func, wait: delays.append((func, wait)))
+	got = []
+	return Dispatcher(lambda vec: got.append(tuple(vec)), **kwargs), got, clock, delays
+
+
+def run(delays):
+	while delays:
+		delays.pop(0)[0]()
+
+
+def test_dispatcher_coalesces_to_the_latest_vector(monkeypatch):
+	d, got, clock, delays = ui_dispatcher(monkeypatch)
+	for x in (1, 2, 3):
+		d.submit(ui.Point(x, 0))
+	assert len(delays) == 1
+	run(delays)
+	assert got == [(3, 0)]
+	assert (d.submitted, d.coalesced, d.delivered) == (3, 2, 1)
+
+
+def test_dispatcher_limits_the_rate(monkeypatch):
+	d, got, clock, delays = ui_dispatcher(monkeypatch, rate=50)
+	d.submit(ui.Point(1, 0))
+	assert delays[0][1] == 0
+	run(delays)
+	clock.now += 0.005
+	d.submit(ui.Point(2, 0))
+	assert delays[0][1] == pytest.approx(0.015)
+	run(delays)
+	clock.now += 0.05
+	d.submit(ui.Point(3, 0))
+	assert delays[0][1] == 0
+	run(delays)
+	assert got == [(1, 0), (2, 0), (3, 0)]
+
+
+def test_dispatcher_snaps_the_dead_zone_to_zero(monkeypatch):
+	d, got, clock, delays = ui_dispatcher(monkeypatch, dead_zone=5)
+	d.submit(ui.Point(3, 3))
+	run(delays)
+	d.submit(ui.Point(10, 0))
+	run(delays)
+	assert got == [(0, 0), (10, 0)]
+
+
+def test_dispatcher_skips_changes_under_the_delta_threshold(monkeypatch):
+	d, got, clock, delays = ui_dispatcher(monkeypatch, delta_threshold=2)
+	for x in (10, 11, 13):
+		d.submit(ui.Point(x, 0))
+		run(delays)
+	assert got == [(10, 0), (13, 0)]
+	assert d.skipped == 1
+
+
+def test_dispatcher_delivers_on_an_event_loop():
+	loop = asyncio.new_event_loop()
+	got = []
+	d = Dispatcher(lambda vec: got.append(tuple(vec)), target=loop)
+	try:
+		for x in (1, 2):
+			d.submit(ui.Point(x, 0))
+		loop.run_until_complete(asyncio.sleep(0.05))
+	finally:
+		loop.close()
+	assert got == [(2, 0)]
+
+
+def test_dispatcher_delivers_on_its_worker_thread():
+	delivered = threading.Event()
+	threads = []
+
+	def action(vec):
+		threads.append(threading.current_thread())
+		delivered.set()
+	d = Dispatcher(action, target="thread")
+	d.submit(ui.Point(1, 0))
+	assert delivered.wait(1)
+	assert threads == [d._worker]
+	d.close()
@@ -0,0 +1,97 @@
+import threading
+import ui
+from KeyValue import KeyValue
+
+
+class InterleavedLock(object):
+	"""Lock stand-in that runs hook right after the next release,
+	as if another thread had been waiting on it"""
+	def __init__(self):
+		self.lock = threading.Lock()
+		self.hook = None
+
+	def __enter__(self):
+		self.lock.acquire()
+
+	def __exit__(self, *exc):
+		self.lock.release()
+		hook, self.hook = self.hook, None
+		if hook:
+			hook()
+
+
+def step():
+	"""Runs the next queued ui.delay, returning False if none"""
+	if not ui._delays:
+		return False
+	ui._delays.pop(0)()
+	return True
+
+
+def test_feed_racing_the_idle_stop_is_applied():
+	ui.cancel_delays()
+	kv = KeyValue(frame=(0, 0, 150, 30))
+	kv._feed_lock = InterleavedLock()
+	kv.feed('first')
+	step()
+	assert kv.value_text == 'first'
+	# idle until the frame that decides to stop
+	for _ in range(kv.frame_rate - 1):
+		assert step()
+	kv._feed_lock.hook = lambda: kv.feed('later')
+	while step():
+		pass
+	assert kv.value_text == 'later'
+	assert not kv._fed
+
+
+def test_update_without_props_does_not_apply_fed_values():
+	ui.cancel_delays()
+	kv = KeyValue(frame=(0, 0, 150, 30), value_text='shown')
+	kv.feed('queued')
+	kv.update()
+	assert kv.value_text == 'shown'
+	while step():
+		pass
+	assert kv.value_text == 'queued'
+
+
+def test_update_redraws_the_underline_once():
+	from headless import counters
+	kv = KeyValue(frame=(0, 0, 150, 30))
+	kv.draw()
+	counters.clear()
+	kv.update(key_font=('<System>', 30), underline_color='red', underline_width=2)
+	assert counters['bridge.setNeedsDisplayInRect_'] == 1
+	assert counters['set_needs_display'] == 0
+
+
+def test_invalid_fed_prop_raises_and_feeding_continues():
+	ui.cancel_delays()
+	kv = KeyValue(frame=(0, 0, 150, 30))
+	try:
+		kv.feed(value_color='not-a-color')
+	except Exception:
+		pass
+	else:
+		assert False, 'expected the bad color to raise'
+	kv.feed('42')
+	while step():
+		pass
+	assert kv.value_text == '42'
+
+
+def test_failing_frame_keeps_the_frames_running(monkeypatch):
+	ui.cancel_delays()
+	kv = KeyValue(frame=(0, 0, 150, 30))
+	kv.feed('first')
+	monkeypatch.setattr(kv, 'update', lambda **props: 1 / 0)
+	try:
+		step()
+	except ZeroDivisionError:
+		pass
+	monkeypatch.undo()
+	kv.feed('second')
+	while step():
+		pass
+	assert kv.value_text == 'second'
@@ -0,0 +1,18 @@
+import measure
+
+
+def test_size_cache_tracks_the_max_through_removals(monkeypatch):
+	sizes = measure.SizeCache(('<System>', 10), ['a', 'bb', 'bb', 'ccc'])
+	widest = sizes.max_width
+	scans = []
+	real_max = max
+	monkeypatch.setattr(measure, 'max', lambda *a, **k: scans.append(1) or real_max(*a, **k),
+											raising=False)
+	sizes.remove(['a', 'bb'])
+	assert sizes.max_width == widest
+	assert scans == []
+	sizes.remove(['ccc'])
+	assert sizes.max_width == measure.measure_string('bb', ('<System>', 10))[0]
+	assert scans
+	sizes.remove(['bb'])
+	assert (sizes.max_width, sizes.max_height) == (0, 0)
@@ -0,0 +1,119 @@
+import ui
+import weakref
+import colors
+import validator
+
+
+"""Themes restyle every subscribed widget in one pass.
+A Theme holds style properties per widget class name, e.g.
+	Theme(ComboBox={'text_color': 'black', 'font': ('<System>', 17)},
+				KeyValue={'key_color': '#333333', 'underline_color': 'grey'},
+				Joystick={'texture_color': 'blue'})
+Subclasses use the properties of the nearest themed base class.
+Widgets take the properties through their restyle(**props) method."""
+class Theme (object):
+	def __init__(self, name='', **styles):
+		self.name = name
+		self.styles = {cls: dict(props) for cls, props in styles.items()}
+		self._resolved = None
+
+	def resolve(self):
+		"""The styles with every color parsed and every font
+		validated, worked out once per theme"""
+		if self._resolved is None:
+			resolved = {}
+			for cls, props in self.styles.items():
+				props = dict(props)
+				for attr, value in props.items():
+					if _is_color(attr):
+						props[attr] = colors.parse(value)
+					elif _is_font(attr) and not validator.validate_font(value):
+						raise ValueError(f"{cls}.{attr}: {value!r} is not a valid font")
+				resolved[cls] = props
+			self._resolved = resolved
+		return self._resolved
+
+	def style_for(self, widget):
+		"""Resolved properties for widget's class, or {}"""
+		resolved = self.resolve()
+		for cls in type(widget).__mro__:
+			if cls.__name__ in resolved:
+				return resolved[cls.__name__]
+		return {}
+
+	def texture_tints(self):
+		"""Distinct Joystick texture tints the theme uses"""
+		return list(dict.fromkeys(props['texture_color']
+															for props in self.resolve().values()
+															if 'texture_color' in props))
+
+
+def _is_color(attr):
+	return attr.endswith('_color') or attr.endswith('_tint')
+
+
+def _is_font(attr):
+	return attr == 'font' or attr.endswith('_font')
+
+
+class ThemeRegistry (object):
+	"""Widgets subscribed here (held weakly) are restyled when a
+	theme is applied. Repeated apply() calls before the deferred
+	pass runs collapse into one pass with the latest theme."""
+	def __init__(self):
+		self.widgets = weakref.WeakSet()
+		self.theme = None
+		self._pending = None
+		self.stats = {'applied': 0, 'passes': 0, 'restyled': 0}
+
+	def subscribe(self, widget):
+		"""Adds widget, styling it now if a theme is current.
+		Returns widget."""
+		self.widgets.add(widget)
+		if self.theme is not None:
+			self._restyle(widget, self.theme)
+		return widget
+
+	def unsubscribe(self, widget):
+		self.widgets.discard(widget)
+
+	def apply(self, theme, defer=True):
+		"""Resolves theme, renders its textures, and restyles every
+		widget on the next run loop pass (or now if not defer)"""
+		theme.resolve()
+		tints = theme.texture_tints()
+		if tints:
+			from Joystick import textures
+			textures.prewarm(tints)
+		self.stats['applied'] += 1
+		scheduled = self._pending is not None
+		self._pending = theme
+		if not defer:
+			self.flush()
+		elif not scheduled:
+			ui.delay(self.flush, 0)
+
+	def flush(self):
+		"""Runs the pending pass, if any. Returns the number of
+		widgets restyled."""
+		theme, self._pending = self._pending, None
+		if theme is None:
+			return 0
+		self.theme = theme
+		count = 0
+		for widget in list(self.widgets):
+			count += self._restyle(widget, theme)
+		self.stats['passes'] += 1
+		self.stats['restyled'] += count
+		return count
+
+	@staticmethod
+	def _restyle(widget, theme):
+		props = theme.style_for(widget)
+		if props:
+			widget.restyle(**props)
+			return 1
+		return 0
+
+
+themes = ThemeRegistry()
@@ -0,0 +1,152 @@
+"""Recording, replay and latency histograms for Joystick input.
+Nothing here imports ui, so recordings can be replayed and
+measured offline against any object with move_to/release."""
+import math
+import struct
+import time
+
+
+MOVED = 0
+ENDED = 1
+
+_MAGIC = b"JSTK\x01"
+_EVENT = struct.Struct("<dBff")
+
+
+class Recording(object):
+	"""Timestamped joystick events packed as (t, kind, x, y)
+	records of 17 bytes: float64 seconds since the first
+	event, uint8 kind, float32 vector."""
+	def __init__(self, data=b""):
+		self.data = bytearray(data)
+
+	def append(self, t, kind, x=0., y=0.):
+		self.data += _EVENT.pack(t, kind, x, y)
+
+	def __len__(self):
+		return len(self.data) // _EVENT.size
+
+	def __iter__(self):
+		return _EVENT.iter_unpack(self.data)
+
+	def to_bytes(self):
+		return _MAGIC + bytes(self.data)
+
+	@classmethod
+	def from_bytes(cls, data):
+		if not data.startswith(_MAGIC) or (len(data) - len(_MAGIC)) % _EVENT.size:
+			raise ValueError("Not a joystick recording")
+		return cls(data[len(_MAGIC):])
+
+	def save(self, path):
+		with open(path, "wb") as f:
+			f.write(self.to_bytes())
+
+	@classmethod
+	def load(cls, path):
+		with open(path, "rb") as f:
+			return cls.from_bytes(f.read())
+
+
+class Recorder(object):
+	"""Records the vectors of a Joystick while attached"""
+	def __init__(self, joystick):
+		self.joystick = joystick
+		self.recording = Recording()
+		self._start = None
+
+	def start(self):
+		self._start = None
+		self.joystick.recorder = self
+		return self
+
+	def stop(self):
+		if self.joystick.recorder is self:
+			self.joystick.recorder = None
+		return self.recording
+
+	def moved(self, x, y):
+		self._add(MOVED, x, y)
+
+	def ended(self):
+		self._add(ENDED)
+
+	def _add(self, kind, x=0., y=0.):
+		now = time.perf_counter()
+		if self._start is None:
+			self._start = now
+		self.recording.append(now - self._start, kind, x, y)
+
+	def __enter__(self):
+		return self.start()
+
+	def __exit__(self, *exc):
+		self.stop()
+
+
+def replay(recording, joystick, speed=1.):
+	"""Feeds recording back through joystick.move_to/release.
+	speed scales the original timing; None replays as fast as
+	possible."""
+	start = time.perf_counter()
+	for t, kind, x, y in recording:
+		if speed:
+			wait = start + t / speed - time.perf_counter()
+			if wait > 0:
+				time.sleep(wait)
+		if kind == MOVED:
+			r = joystick.radius
+			joystick.move_to((x + r, y + r))
+		else:
+			joystick.release()
+
+
+class LatencyHistogram(object):
+	"""Log2-bucketed histogram of durations in seconds.
+	Bucket i counts durations in [2**i, 2**(i+1)) microseconds."""
+	BUCKETS = 32
+
+	def __init__(self):
+		self.counts = [0] * self.BUCKETS
+		self.count = 0
+		self.total = 0.
+		self.max = 0.
+
+	def add(self, seconds):
+		us = seconds * 1e6
+		i = min(max(int(math.log2(us)), 0), self.BUCKETS - 1) if us >= 1 else 0
+		self.counts[i] += 1
+		self.count += 1
+		self.total += seconds
+		self.max = max(self.max, seconds)
+
+	def percentile(self, p):
+		"""Upper bound in seconds of the bucket holding percentile p"""
+		if not self.count:
+			return 0.
+		rank = p / 100. * self.count
+		seen = 0
+		for i, n in enumerate(self.counts):
+			seen += n
+			if seen >= rank:
+				return min(2 ** (i + 1) / 1e6, self.max)
+		return self.max
+
+	def summary(self):
+		return {"count": self.count,
+						"mean": self.total / self.count if self.count else 0.,
+						"p50": self.percentile(50),
+						"p99": self.percentile(99),
+						"max": self.max}
+
+
+class LatencyProbe(object):
+	"""Histograms for one joystick: touch to action start
+	(dispatch) and time spent in action (handler)."""
+	def __init__(self):
+		self.dispatch = LatencyHistogram()
+		self.handler = LatencyHistogram()
+
+	def summary(self):
+		return {"dispatch": self.dispatch.summary(),
+						"handler": self.handler.summary()}
@@ -1,36 +1,81 @@
+import json
+import os
+import platform
+import colors
 import objc_util as objc
 
 
 UIFont = objc.ObjCClass('UIFont')
-FONT_FAMILIES = [i.cString().decode() for i in UIFont.familyNames()]
-FONT_FAMILIES.extend(['<System>', '<System-Bold>'])
 
-UIColor = objc.ObjCClass('UIColor')
+SYSTEM_FONTS = ('<System>', '<System-Bold>')
+
+# Set to a file path to keep the font family list on disk
+# between launches. The file is rewritten after OS updates.
+FONT_CACHE = None
+
+_font_families = None
+
+
+def font_families():
+	"""Frozenset of the available font family names,
+	enumerated on first use"""
+	global _font_families
+	if _font_families is None:
+		_font_families = frozenset(_load_font_families())
+	return _font_families
+
+
+def refresh_fonts():
+	"""Forgets the font families so the next check enumerates them again"""
+	global _font_families
+	_font_families = None
+	globals().pop('FONT_FAMILIES', None)
+
+
+def _font_cache_key():
+	return f'{platform.system()} {platform.release()} {platform.version()}'
+
+
+def _load_font_families():
+	path = FONT_CACHE and os.path.expanduser(FONT_CACHE)
+	if path:
+		try:
+			with open(path) as f:
+				cached = json.load(f)
+			if cached.get('key') == _font_cache_key():
+				return cached['families']
+		except (OSError, ValueError, AttributeError, KeyError):
+			pass
+	families = [i.cString().decode() for i in UIFont.familyNames()]
+	families.extend(SYSTEM_FONTS)
+	if path:
+		try:
+			with open(path, 'w') as f:
+				json.dump({'key': _font_cache_key(), 'families': families}, f)
+		except OSError:
+			pass
+	return families
+
+
+def __getattr__(name):
+	# FONT_FAMILIES is built on first access rather than at import
+	if name == 'FONT_FAMILIES':
+		families = globals()['FONT_FAMILIES'] = tuple(sorted(font_families()))
+		return families
+	raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def validate_font(value):
 	if type(value) is tuple and len(value) == 2:
 		x, y = value
 		if isinstance(y, (int, float)) and type(x) is str:
-			if x in FONT_FAMILIES and y > 0:
+			if x in font_families() and y > 0:
 				return True
 	return False
 
 
 def validate_color(value):
-	if type(value) is str:
-		if len(value) == 7 or len(value) == 9 and value[0] == '#':
-			if all(i in '0123456789abcdef' for i in value[1:]):
-				return True
-		elif UIColor.colorWithName_(value):
-			return True
-	elif type(value) is tuple:
-		if 3 <= len(value) <= 4  and all(isinstance(i, (int, float)) for i in value):
-			if all(0 <= i <= 1 for i in value):
-				return True
-	elif type(value) == type(None):
-		return True
-	return False
+	return colors.is_valid(value)
 
 
 if __name__ == '__main__':
@@ -56,3 +101,5 @@ if __name__ == '__main__':
 	print(validate_color('#95ffb4ff'))
 	print(validate_color('#ahahsb'))
 	print(validate_color('#abababa'))
+	print(validate_color('95ffb4f'))
+	print(validate_color('#95FFB4'))